@@ -0,0 +1,93 @@
+"""
+Script Name : authentication.py
+Description : Stateless JWT authentication building users from token claims
+Author      : @tonybnya
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from apps.metrics import CACHE_REQUESTS
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+# LRU user_id -> (expires_at, User), per process
+_user_cache = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+
+def get_cached_user(user_id):
+    """
+    Return the User row for `user_id`, cached for JWT_USER_CACHE_TTL seconds
+    in an LRU of at most JWT_USER_CACHE_SIZE users.
+    """
+    now = time.monotonic()
+    with _user_cache_lock:
+        cached = _user_cache.get(user_id)
+        if cached and cached[0] > now:
+            _user_cache.move_to_end(user_id)
+            CACHE_REQUESTS.inc(cache='jwt_user', result='hit')
+            return cached[1]
+    CACHE_REQUESTS.inc(cache='jwt_user', result='miss')
+
+    user = get_user_model().objects.filter(pk=user_id).first()
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+        _user_cache[user_id] = (now + settings.JWT_USER_CACHE_TTL, user)
+        while len(_user_cache) > settings.JWT_USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+    return user
+
+
+class ClaimsUser(TokenUser):
+    """
+    Lightweight user built from the claims added by
+    CustomTokenObtainPairSerializer.get_token, without a database query.
+    Use `full_user` when the actual User row is needed.
+    """
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def first_name(self):
+        return self.token.get('first_name', '')
+
+    @cached_property
+    def last_name(self):
+        return self.token.get('last_name', '')
+
+    @cached_property
+    def date_joined(self):
+        value = self.token.get('date_joined')
+        return parse_datetime(value) if value else None
+
+    @cached_property
+    def full_user(self):
+        return get_cached_user(self.id)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that trusts the signed claims instead of loading the
+    User on every request. Deactivated or deleted users are refused within
+    JWT_USER_CACHE_TTL seconds (through get_cached_user); other changes
+    (is_staff, new name) are seen once their access token is refreshed.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        user = get_cached_user(validated_token[api_settings.USER_ID_CLAIM])
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return ClaimsUser(validated_token)
@@ -0,0 +1,143 @@
+"""
+Script Name : blacklist.py
+Description : Refresh token blacklist checks backed by a Bloom filter and the shared cache
+Author      : @tonybnya
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+CACHE_PREFIX = 'jwt-blacklist:'
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings: no false negatives, false
+    positives at about `error_rate` once `capacity` keys are added.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevokedTokenRegistry:
+    """
+    Per-process view of the blacklisted JTIs.
+
+    Lookups go Bloom filter -> shared cache -> database, so the common case
+    (a token that was never revoked) costs no I/O at all. The filter picks up
+    tokens revoked by other processes every JWT_BLACKLIST_SYNC_INTERVAL
+    seconds and is rebuilt from scratch every JWT_BLACKLIST_REBUILD_INTERVAL
+    seconds, which also drops pruned tokens.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._last_id = 0
+        self._synced_at = 0
+        self._built_at = 0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._bloom is not None and now - self._synced_at < settings.JWT_BLACKLIST_SYNC_INTERVAL:
+            return
+
+        with self._lock:
+            if self._bloom is not None and now - self._synced_at < settings.JWT_BLACKLIST_SYNC_INTERVAL:
+                return
+            blacklisted = BlacklistedToken.objects.all()
+            rebuild = (
+                self._bloom is None
+                or now - self._built_at >= settings.JWT_BLACKLIST_REBUILD_INTERVAL
+                or self._bloom.count >= self._bloom.capacity
+            )
+            if rebuild:
+                blacklisted = blacklisted.filter(token__expires_at__gt=timezone.now())
+                capacity = max(settings.JWT_BLACKLIST_BLOOM_CAPACITY, blacklisted.count() * 2)
+                bloom = BloomFilter(capacity, settings.JWT_BLACKLIST_BLOOM_ERROR_RATE)
+                last_id = blacklisted.aggregate(last=Max('id'))['last'] or 0
+                blacklisted = blacklisted.filter(id__lte=last_id)
+                self._built_at = now
+            else:
+                bloom = self._bloom
+                last_id = self._last_id
+                blacklisted = blacklisted.filter(id__gt=last_id)
+
+            for row_id, jti in blacklisted.values_list('id', 'token__jti').iterator():
+                bloom.add(jti)
+                last_id = max(last_id, row_id)
+
+            self._bloom = bloom
+            self._last_id = last_id
+            self._synced_at = now
+
+    def add(self, jti, expires_at):
+        self._refresh()
+        with self._lock:
+            self._bloom.add(jti)
+        timeout = max(1, int((expires_at - timezone.now()).total_seconds()))
+        cache.set(CACHE_PREFIX + jti, True, timeout)
+
+    def is_revoked(self, jti):
+        self._refresh()
+        if jti not in self._bloom:
+            return False
+
+        # Bloom filter hit: confirm, the shared cache answers for any process
+        revoked = cache.get(CACHE_PREFIX + jti)
+        if revoked is None:
+            revoked = BlacklistedToken.objects.filter(token__jti=jti).exists()
+            cache.set(CACHE_PREFIX + jti, revoked, settings.JWT_BLACKLIST_CACHE_TIMEOUT)
+        return revoked
+
+
+revoked_tokens = RevokedTokenRegistry()
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """
+    Refresh token whose blacklist check goes through `revoked_tokens`
+    instead of querying the blacklist table on every refresh.
+    """
+
+    def check_blacklist(self):
+        if revoked_tokens.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError("Token is blacklisted")
+
+    def blacklist(self):
+        blacklisted, created = super().blacklist()
+        if not created:
+            # Blacklisted by another process the filter has not synced with
+            # yet: the unique row settles the race, reject the reuse.
+            raise TokenError("Token is blacklisted")
+
+        revoked_tokens.add(blacklisted.token.jti, blacklisted.token.expires_at)
+        return blacklisted, created
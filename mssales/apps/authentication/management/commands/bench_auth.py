@@ -0,0 +1,47 @@
+"""
+Script Name : bench_auth.py
+Description : Per-request authentication overhead benchmark
+Author      : @tonybnya
+"""
+import time
+
+from apps.authentication.authentication import StatelessJWTAuthentication
+from apps.authentication.serializers import CustomTokenObtainPairSerializer
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+class Command(BaseCommand):
+    help = "Compare the per-request cost of JWTAuthentication and StatelessJWTAuthentication."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        user, created = User.objects.get_or_create(
+            username='bench-auth',
+            defaults={'email': 'bench-auth@example.com', 'first_name': 'Bench', 'last_name': 'Auth'}
+        )
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        request = Request(APIRequestFactory().get('/api/auth/profile/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+
+        for backend in (JWTAuthentication(), StatelessJWTAuthentication()):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(options['requests']):
+                    backend.authenticate(request)
+                elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{type(backend).__name__:<28} "
+                f"{elapsed / options['requests'] * 1e6:8.1f} us/request  "
+                f"{len(queries) / options['requests']:.2f} queries/request"
+            )
+
+        if created:
+            user.delete()
@@ -0,0 +1,39 @@
+"""
+Script Name : prune_tokens.py
+Description : Delete expired outstanding and blacklisted tokens in batches
+Author      : @tonybnya
+"""
+import time
+
+from apps.purge import delete_rows
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = "Prune expired tokens in bounded batches (unlike flushexpiredtokens' single delete)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        started = time.monotonic()
+        pruned = 0
+
+        while True:
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=now)
+                .order_by('expires_at').values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                # children first, so neither delete needs the cascade collector
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                delete_rows(OutstandingToken.objects.filter(id__in=ids))
+            pruned += len(ids)
+
+        self.stdout.write(f"{pruned} expired token(s) pruned in {time.monotonic() - started:.2f}s")
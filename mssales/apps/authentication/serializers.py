@@ -4,12 +4,19 @@ Description : Serializers for the authentication
 Author      : @tonybnya
 """
 
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .blacklist import CachedBlacklistRefreshToken
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = CachedBlacklistRefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
@@ -18,10 +25,41 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['email'] = user.email
         token['first_name'] = user.first_name
         token['last_name'] = user.last_name
+        # lets StatelessJWTAuthentication serve the profile without a DB query
+        token['date_joined'] = user.date_joined.isoformat()
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
 
         return token
 
 
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh tokens against the current User row: inactive or deleted users
+    are refused, and the new tokens carry claims re-issued from the row
+    (simplejwt would copy them from the old refresh token).
+    """
+    token_class = CachedBlacklistRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed('No active account found for the given token', code='no_active_account')
+
+        token = CustomTokenObtainPairSerializer.get_token(user)
+        data = {'access': str(token.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            data['refresh'] = str(token)
+
+        return data
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -6,20 +6,24 @@ Author      : @tonybnya
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from .serializers import CustomTokenObtainPairSerializer, UserSerializer
+from .serializers import CachedTokenRefreshSerializer, CustomTokenObtainPairSerializer, UserSerializer
 
 
 class CustomeTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 
+class CachedTokenRefreshView(TokenRefreshView):
+    serializer_class = CachedTokenRefreshSerializer
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_profile(request):
     """
-    Get current user profile
+    Get current user profile (built from the token claims, no DB query)
     """
     serializer = UserSerializer(request.user)
     return Response(serializer.data)
@@ -0,0 +1,124 @@
+"""
+Script Name : dedup.py
+Description : Blocking-key duplicate detection and merging of customers
+Author      : @tonybnya
+"""
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Concat, Lower, Trim
+
+from .models import Customer
+
+# Customers are only compared within a block sharing the same key, so
+# finding duplicates is a GROUP BY per key instead of comparing every pair.
+BLOCKING_KEYS = {
+    'email': models.F('email_normalized'),
+    'phone': models.F('phone_e164'),
+    'name': Concat(
+        Lower(Trim('name')), models.Value('|'), Lower(Trim(Coalesce('zip_code', models.Value('')))),
+        output_field=models.CharField()
+    ),
+}
+
+# Fields copied from a duplicate when the kept customer has no value
+MERGED_FIELDS = [
+    'billing_address', 'shipping_address', 'related_company',
+    'street', 'city', 'state', 'zip_code'
+]
+
+
+def duplicate_blocks(key, queryset=None):
+    """
+    Yield the ids of the customers sharing each value of the blocking `key`,
+    for values shared by at least two customers.
+    """
+    queryset = Customer.objects.all() if queryset is None else queryset
+    blocks = queryset.order_by().annotate(block=BLOCKING_KEYS[key]).exclude(block__isnull=True).exclude(block='')
+    shared = blocks.values('block').annotate(size=models.Count('id')).filter(size__gt=1).values('block')
+
+    ids, current = [], None
+    for block, customer_id in blocks.filter(block__in=shared).order_by('block', 'id').values_list('block', 'id').iterator():
+        if block != current:
+            if len(ids) > 1:
+                yield ids
+            ids, current = [], block
+        ids.append(customer_id)
+    if len(ids) > 1:
+        yield ids
+
+
+def duplicate_clusters(keys=('email', 'phone'), queryset=None):
+    """
+    Return clusters (sorted lists of ids) of customers linked by any of the
+    blocking `keys`, e.g. same email or same phone, transitively.
+    """
+    parents = {}
+
+    def find(customer_id):
+        root = parents.setdefault(customer_id, customer_id)
+        while root != parents[root]:
+            root = parents[root]
+        while customer_id != root:
+            parents[customer_id], customer_id = root, parents[customer_id]
+        return root
+
+    for key in keys:
+        for ids in duplicate_blocks(key, queryset):
+            root = find(ids[0])
+            for customer_id in ids[1:]:
+                other = find(customer_id)
+                if other != root:
+                    parents[max(root, other)] = min(root, other)
+                    root = min(root, other)
+
+    clusters = {}
+    for customer_id in parents:
+        clusters.setdefault(find(customer_id), []).append(customer_id)
+    return sorted(sorted(ids) for ids in clusters.values())
+
+
+def find_duplicates(customer, keys=('email', 'phone')):
+    """
+    Return the other customers sharing a blocking key with `customer`,
+    with indexed lookups on the normalized columns.
+    """
+    lookups = models.Q()
+    if 'email' in keys and customer.email_normalized:
+        lookups |= models.Q(email_normalized=customer.email_normalized)
+    if 'phone' in keys and customer.phone_e164:
+        lookups |= models.Q(phone_e164=customer.phone_e164)
+    if not lookups:
+        return Customer.objects.none()
+    return Customer.objects.filter(lookups).exclude(pk=customer.pk)
+
+
+def merge_customers(target_id, duplicate_ids):
+    """
+    Merge the `duplicate_ids` customers into `target_id`: their sales orders
+    move with one UPDATE, blank fields of the target are filled from them,
+    and they are deleted. Return the number of orders moved.
+    """
+    from apps.sales.models import ArchivedSalesOrder, SalesOrder
+
+    duplicate_ids = sorted(set(duplicate_ids) - {target_id})
+    with transaction.atomic():
+        customers = Customer.objects.select_for_update().in_bulk([target_id, *duplicate_ids])
+        if target_id not in customers:
+            raise Customer.DoesNotExist(f"Customer {target_id} does not exist")
+        missing = [customer_id for customer_id in duplicate_ids if customer_id not in customers]
+        if missing:
+            raise Customer.DoesNotExist(f"Customers {missing} do not exist")
+
+        target = customers[target_id]
+        changed = [
+            field for field in MERGED_FIELDS
+            if not getattr(target, field) and any(getattr(customers[pk], field) for pk in duplicate_ids)
+        ]
+        for field in changed:
+            setattr(target, field, next(getattr(customers[pk], field) for pk in duplicate_ids if getattr(customers[pk], field)))
+        if changed:
+            target.save(update_fields=[*changed, 'updated_at'])
+
+        moved = SalesOrder.objects.filter(customer_id__in=duplicate_ids).update(customer_id=target_id)
+        ArchivedSalesOrder.objects.filter(customer_id__in=duplicate_ids).update(customer_id=target_id)
+        Customer.objects.filter(pk__in=duplicate_ids).delete()
+    return moved
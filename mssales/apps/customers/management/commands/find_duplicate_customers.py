@@ -0,0 +1,49 @@
+"""
+Script Name : find_duplicate_customers.py
+Description : Report (and optionally merge) duplicate customers found by blocking keys
+Author      : @tonybnya
+"""
+import json
+import logging
+import time
+
+from apps.customers.dedup import BLOCKING_KEYS, duplicate_clusters, merge_customers
+from django.core.management.base import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Find customers sharing a normalized email, phone or name+zip code, one GROUP BY per key."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keys', nargs='+', choices=sorted(BLOCKING_KEYS), default=['email', 'phone'],
+            help="Blocking keys linking duplicates (default: email phone)."
+        )
+        parser.add_argument('--output', help="Write one JSON cluster per line to this file instead of stdout.")
+        parser.add_argument(
+            '--merge', action='store_true',
+            help="Merge each cluster into its oldest customer (lowest id), moving sales orders."
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        clusters = duplicate_clusters(options['keys'])
+        elapsed = time.monotonic() - started
+
+        output = open(options['output'], 'w') if options['output'] else self.stdout
+        try:
+            for ids in clusters:
+                output.write(json.dumps({'keep': ids[0], 'duplicates': ids[1:]}) + '\n')
+        finally:
+            if options['output']:
+                output.close()
+
+        duplicates = sum(len(ids) - 1 for ids in clusters)
+        message = f"{len(clusters)} cluster(s), {duplicates} duplicate customer(s) found in {elapsed:.2f}s"
+        if options['merge']:
+            moved = sum(merge_customers(ids[0], ids[1:]) for ids in clusters)
+            message += f"; merged, {moved} sales order(s) moved"
+        logger.info(message)
+        self.stderr.write(message)
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:32
+
+from django.db import migrations, models
+
+from apps.customers.normalization import normalize_email, normalize_phone
+
+BATCH_SIZE = 1000
+
+
+def backfill_contacts(apps, schema_editor):
+    """
+    Fill email_normalized/phone_e164 of the existing customers, by batches.
+    """
+    Customer = apps.get_model('customers', 'Customer')
+
+    batch = []
+    for customer in Customer.objects.only('id', 'email', 'phone').order_by('id').iterator(chunk_size=BATCH_SIZE):
+        customer.email_normalized = normalize_email(customer.email)
+        customer.phone_e164 = normalize_phone(customer.phone)
+        batch.append(customer)
+        if len(batch) >= BATCH_SIZE:
+            Customer.objects.bulk_update(batch, ['email_normalized', 'phone_e164'])
+            batch = []
+    Customer.objects.bulk_update(batch, ['email_normalized', 'phone_e164'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='email_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='phone_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.RunPython(backfill_contacts, migrations.RunPython.noop),
+    ]
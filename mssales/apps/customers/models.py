@@ -4,12 +4,11 @@ Description : Customer model
 Author      : @tonybnya
 """
 
-
-import re
-
 from django.core.validators import EmailValidator
 from django.db import models
 
+from .normalization import normalize_email, normalize_phone
+
 
 class Customer(models.Model):
     """
@@ -18,6 +17,9 @@ class Customer(models.Model):
     name = models.CharField(max_length=255)
     email = models.EmailField(validators=[EmailValidator()])
     phone = models.CharField(max_length=20)
+    # canonical forms of email and phone, set on save, used for lookups and deduplication
+    email_normalized = models.CharField(max_length=254, editable=False, db_index=True, default='')
+    phone_e164 = models.CharField(max_length=16, editable=False, db_index=True, blank=True, null=True)
 
     billing_address = models.TextField(blank=True, null=True)
     shipping_address = models.TextField(blank=True, null=True)
@@ -41,11 +43,18 @@ class Customer(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.email_normalized = normalize_email(self.email)
+        self.phone_e164 = normalize_phone(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'email_normalized', 'phone_e164'}
+        super().save(*args, **kwargs)
+
     def clean(self):
         super().clean()
         # phone number format validation
-        phone_pattern = re.compile(r'^\+?1?\d{9,15}$')
-        if self.phone and not phone_pattern.match(self.phone.replace(' ', ' ').replace('-', '')):
+        if self.phone and normalize_phone(self.phone) is None:
             from django.core.exceptions import ValidationError
             raise ValidationError({'phone': 'Enter a valid phone number.'})
 
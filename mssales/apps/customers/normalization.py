@@ -0,0 +1,51 @@
+"""
+Script Name : normalization.py
+Description : Canonical forms of customer emails and phone numbers
+Author      : @tonybnya
+"""
+import re
+
+from django.conf import settings
+
+NON_DIGITS = re.compile(r'\D')
+# E.164: up to 15 digits including the country code
+MIN_PHONE_DIGITS = 8
+MAX_PHONE_DIGITS = 15
+# digits required of a number entered through the API (national number with its area code)
+MIN_INPUT_PHONE_DIGITS = 10
+
+
+def normalize_email(email):
+    """
+    Lowercased, trimmed email, or '' when empty.
+    """
+    return (email or '').strip().lower()
+
+
+def normalize_phone(phone, country_code=None):
+    """
+    Return `phone` in E.164 form ("+15551234567"), or None if it cannot be
+    a valid number. Numbers without an international prefix ("+" or "00")
+    get `country_code` (default CUSTOMER_DEFAULT_COUNTRY_CODE).
+    """
+    phone = (phone or '').strip()
+    digits = NON_DIGITS.sub('', phone)
+    if not digits:
+        return None
+
+    if phone.startswith('+'):
+        number = digits
+    elif digits.startswith('00'):
+        number = digits[2:]
+    else:
+        country_code = country_code or getattr(settings, 'CUSTOMER_DEFAULT_COUNTRY_CODE', '1')
+        national = digits.lstrip('0')
+        if digits.startswith(country_code) and len(digits) > 10:
+            # national number already written with its country code
+            number = digits
+        else:
+            number = country_code + national
+
+    if not MIN_PHONE_DIGITS <= len(number) <= MAX_PHONE_DIGITS or number.startswith('0'):
+        return None
+    return f'+{number}'
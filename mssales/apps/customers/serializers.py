@@ -3,15 +3,14 @@ Script Name : serializers.py
 Description : Serializers for the Customers app
 Author      : @tonybnya
 """
-
-import re
-
+from apps.tracing import TracedSerializerMixin
 from rest_framework import serializers
 
 from .models import Customer
+from .normalization import MIN_INPUT_PHONE_DIGITS, NON_DIGITS, normalize_email, normalize_phone
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer of the Customer Model.
     """
@@ -22,21 +21,25 @@ class CustomerSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'email', 'phone', 'billing_address', 'shipping_address',
             'is_company', 'related_company', 'street', 'city', 'state', 'zip_code',
-            'country', 'full_address', 'created_at', 'updated_at'
+            'country', 'full_address', 'email_normalized', 'phone_e164', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'full_address']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'full_address', 'email_normalized', 'phone_e164']
 
     def validate_phone(self, value):
         """
-        Basic phone validation - just check that it contains digits and is reasonable length
+        Phone validation - at least 10 digits, and the number must normalize
+        to E.164 like Customer.clean
         """
-        clean_phone = ''.join(filter(str.isdigit, value))
-        if len(clean_phone) < 10:
-            raise serializers.ValidationError("Phone number must contain at least 10 digits.")
+        if len(NON_DIGITS.sub('', value)) < MIN_INPUT_PHONE_DIGITS:
+            raise serializers.ValidationError(f"Phone number must contain at least {MIN_INPUT_PHONE_DIGITS} digits.")
+        if normalize_phone(value) is None:
+            raise serializers.ValidationError("Enter a valid phone number.")
         return value
 
     def validate_email(self, value):
-        if Customer.objects.filter(email=value).exclude(pk=self.instance.pk if self.instance else None).exists():
+        # indexed lookup on the normalized column, case-insensitive
+        customers = Customer.objects.filter(email_normalized=normalize_email(value))
+        if customers.exclude(pk=self.instance.pk if self.instance else None).exists():
             raise serializers.ValidationError("Customer with this email already exists.")
         return value
 
@@ -48,3 +51,7 @@ class CustomerSummarySerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = ['id', 'name', 'email', 'phone', 'city', 'state']
+
+
+class CustomerMergeSerializer(serializers.Serializer):
+    duplicates = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=1000)
@@ -3,17 +3,19 @@ Script Name : views.py
 Description : Views of the Customer Model
 Author      : @tonybnya
 """
+from apps.mixins import MultiGetMixin, ReplicaReadMixin, TracingMixin
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, viewsets
+from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from .dedup import find_duplicates, merge_customers
 from .models import Customer
-from .serializers import CustomerSerializer, CustomerSummarySerializer
+from .serializers import CustomerMergeSerializer, CustomerSerializer, CustomerSummarySerializer
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(TracingMixin, MultiGetMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     Customer View.
     """
@@ -25,6 +27,8 @@ class CustomerViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'email', 'phone', 'city', 'state']
     ordering_fields = ['name', 'created_at', 'city', 'state']
     ordering = ['name']
+    replica_actions = {'list': None, 'summary': None, 'companies': None, 'orders': 10, 'stats': 30}
+    throttle_costs = {'summary': 5, 'orders': 5, 'stats': 5}
 
     def get_serializer_class(self):
         if self.action == 'summary':
@@ -56,7 +60,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
         """
         customer = self.get_object()
         from apps.sales.serializers import SalesOrderSerializer
-        orders = customer.sales_orders.all().order_by('-created_at')
+        orders = customer.sales_orders.all().prefetch_related('order_lines__product').order_by('-created_at')
         serializer = SalesOrderSerializer(orders, many=True)
         return Response(serializer.data)
 
@@ -66,15 +70,47 @@ class CustomerViewSet(viewsets.ModelViewSet):
         Get customer stats.
         """
         customer = self.get_object()
-        orders = customer.sales_orders.all()
+        from apps.sales.pricing import order_stats
+        orders = order_stats(customer.sales_orders.all())
 
         stats = {
             'customer_id': customer.id,
             'customer_name': customer.name,
-            'total_orders': orders.count(),
-            'draft_orders': orders.filter(status='draft').count(),
-            'confirmed_orders': orders.filter(status='confirmed').count(),
-            'cancelled_orders': orders.filter(status='cancelled').count(),
-            'total_amount': sum(order.total_amount for order in orders)
+            'total_orders': orders['total_orders'],
+            'draft_orders': orders['draft_orders'],
+            'confirmed_orders': orders['confirmed_orders'],
+            'cancelled_orders': orders['cancelled_orders'],
+            'total_amount': orders['total_amount']
         }
         return Response(stats)
+
+    @action(detail=True, methods=['get'])
+    def duplicates(self, request, pk=None):
+        """
+        Get customers sharing this customer's normalized email or phone.
+        """
+        customer = self.get_object()
+        serializer = CustomerSummarySerializer(find_duplicates(customer), many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """
+        Merge duplicate customers ({"duplicates": [ids]}) into this one,
+        moving their sales orders.
+        """
+        customer = self.get_object()
+        serializer = CustomerMergeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            moved = merge_customers(customer.pk, serializer.validated_data['duplicates'])
+        except Customer.DoesNotExist as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        customer.refresh_from_db()
+        return Response({
+            'message': 'Customers merged successfully',
+            'orders_moved': moved,
+            'customer': CustomerSerializer(customer).data
+        })
@@ -0,0 +1,107 @@
+"""
+Script Name : db_routers.py
+Description : Database router sending safe reads to a read replica
+Author      : @tonybnya
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# replica alias used for reads in the current request (None means primary)
+_read_alias = ContextVar('read_alias', default=None)
+# set as soon as the current request writes, so it reads its own writes
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+
+# alias -> (checked_at, lag in seconds), shared by the whole process
+_lag_cache = {}
+
+
+def get_replica_alias():
+    """
+    Return the configured replica alias, or None when no replica is set up.
+    """
+    alias = getattr(settings, 'DATABASE_REPLICA_ALIAS', None)
+    if alias and alias in settings.DATABASES:
+        return alias
+    return None
+
+
+def replica_lag(alias):
+    """
+    Return the replication lag of a replica in seconds.
+    The value is cached for REPLICA_LAG_CHECK_INTERVAL seconds per process.
+    """
+    interval = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 1.0)
+    now = time.monotonic()
+    cached = _lag_cache.get(alias)
+    if cached and now - cached[0] < interval:
+        return cached[1]
+
+    connection = connections[alias]
+    lag = 0.0
+    try:
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT CASE WHEN pg_is_in_recovery() "
+                    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+                    "ELSE 0 END"
+                )
+                lag = float(cursor.fetchone()[0])
+    except DatabaseError:
+        # an unreachable replica is treated as infinitely late
+        lag = float('inf')
+
+    _lag_cache[alias] = (now, lag)
+    return lag
+
+
+@contextmanager
+def use_replica(lag_tolerance=None):
+    """
+    Route reads made inside the block to the replica.
+    Falls back to the primary when there is no replica or when its lag
+    exceeds `lag_tolerance` (defaults to REPLICA_LAG_TOLERANCE).
+    """
+    if lag_tolerance is None:
+        lag_tolerance = getattr(settings, 'REPLICA_LAG_TOLERANCE', 5)
+
+    alias = get_replica_alias()
+    if alias and replica_lag(alias) > lag_tolerance:
+        alias = None
+
+    alias_token = _read_alias.set(alias)
+    pinned_token = _pinned_to_primary.set(False)
+    try:
+        yield alias or DEFAULT_DB_ALIAS
+    finally:
+        _read_alias.reset(alias_token)
+        _pinned_to_primary.reset(pinned_token)
+
+
+class ReplicaRouter:
+    """
+    Send reads to the replica only inside `use_replica()` blocks.
+    Writes always go to the primary and pin the rest of the block there.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _pinned_to_primary.get():
+            return DEFAULT_DB_ALIAS
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        if _read_alias.get() is not None:
+            _pinned_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica is a copy of the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica receives its schema through replication
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,84 @@
+"""
+Script Name : relay_outbox.py
+Description : Deliver outbox events in batches to a file or webhook sink
+Author      : @tonybnya
+"""
+import logging
+import time
+
+from apps.events.models import OutboxEvent
+from apps.events.outbox import SINKS, RelayBusy, SinkError, prune_delivered, relay_batch
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Drain the outbox to a sink, at least once and in order (run one relay; --loop to keep running)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sink', choices=sorted(SINKS), default=settings.OUTBOX_SINK)
+        parser.add_argument('--path', help="File sink: JSON lines file (default OUTBOX_FILE_PATH).")
+        parser.add_argument('--url', help="Webhook sink: URL receiving POSTed batches (default OUTBOX_WEBHOOK_URL).")
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE, help="Events per delivery.")
+        parser.add_argument('--max-batches', type=int, default=0, help="Stop after this many batches (0: no limit).")
+        parser.add_argument('--loop', action='store_true', help="Keep polling once the outbox is drained.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds between polls of an empty outbox.")
+        parser.add_argument(
+            '--prune-days', type=int, default=settings.OUTBOX_RETENTION_DAYS,
+            help="Delete events delivered more than this many days ago before relaying (0: keep them)."
+        )
+
+    def handle(self, *args, **options):
+        if options['sink'] == 'file':
+            sink = SINKS['file'](options['path'])
+        else:
+            sink = SINKS['webhook'](options['url'])
+
+        if options['prune_days']:
+            pruned = prune_delivered(options['prune_days'])
+            if pruned:
+                self.stdout.write(f"{pruned} delivered event(s) pruned")
+
+        self.started = time.monotonic()
+        self.delivered = self.batches = self.failures = 0
+        self.lag = None
+        try:
+            while not options['max_batches'] or self.batches < options['max_batches']:
+                try:
+                    events = relay_batch(sink, options['batch_size'])
+                except (SinkError, RelayBusy) as e:
+                    self.failures += 1
+                    logger.warning("Outbox relay: %s", e)
+                    self.stderr.write(str(e))
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                if events:
+                    self.delivered += len(events)
+                    self.batches += 1
+                    # end-to-end delay of the newest event delivered
+                    self.lag = (timezone.now() - events[-1].created_at).total_seconds()
+                elif options['loop']:
+                    time.sleep(options['interval'])
+                else:
+                    break
+        except KeyboardInterrupt:
+            pass
+        self.report()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.delivered / elapsed if elapsed else 0
+        pending = OutboxEvent.objects.filter(delivered_at__isnull=True).count()
+        lag = f", lag {self.lag:.2f}s" if self.lag is not None else ''
+        message = (
+            f"{self.delivered} event(s) delivered in {self.batches} batch(es), {self.failures} failure(s), "
+            f"{elapsed:.2f}s ({rate:.0f} events/s{lag}), {pending} pending"
+        )
+        logger.info(message)
+        self.stdout.write(message)
@@ -0,0 +1,54 @@
+"""
+Script Name : models.py
+Description : Transactional outbox of order and stock events
+Author      : @tonybnya
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxEvent(models.Model):
+    """
+    Modelisation of an OutboxEvent.
+    Written in the same transaction as the change it describes, delivered
+    later (at least once, in id order) by the relay_outbox command.
+    """
+    aggregate_type = models.CharField(max_length=50)
+    aggregate_id = models.BigIntegerField()
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+    # failed deliveries of the batch holding this event
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        db_table = 'outbox_events'
+        ordering = ['id']
+        indexes = [
+            # relay: delivered_at IS NULL ORDER BY id, stays small as events are delivered
+            models.Index(fields=['id'], condition=models.Q(delivered_at__isnull=True), name='outbox_events_pending_idx'),
+            # history of one aggregate, e.g. every event of an order
+            models.Index(fields=['aggregate_type', 'aggregate_id', 'id'], name='outbox_events_aggregate_idx'),
+            # pruning of delivered events
+            models.Index(fields=['delivered_at'], name='outbox_events_delivered_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.aggregate_type}:{self.aggregate_id}"
+
+    def as_message(self):
+        """
+        Event as delivered to sinks; consumers deduplicate on `id`.
+        """
+        return {
+            'id': self.id,
+            'type': self.event_type,
+            'aggregate_type': self.aggregate_type,
+            'aggregate_id': self.aggregate_id,
+            'payload': self.payload,
+            'created_at': self.created_at,
+        }
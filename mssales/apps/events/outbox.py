@@ -0,0 +1,173 @@
+"""
+Script Name : outbox.py
+Description : Record outbox events and relay them to a file or webhook sink
+Author      : @tonybnya
+"""
+import json
+import os
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+# pg_try_advisory_lock key held by the relay for the whole batch, so that a
+# single relay delivers at a time and events of an aggregate keep their order
+RELAY_LOCK_ID = 0x6f7574626f78
+
+
+class SinkError(Exception):
+    """
+    Raised by a sink when a batch could not be delivered.
+    """
+
+
+class RelayBusy(Exception):
+    """
+    Raised when another relay holds the outbox.
+    """
+
+
+def record_event(aggregate_type, aggregate_id, event_type, payload=None):
+    """
+    Append one event; call it inside the transaction making the change.
+    """
+    return OutboxEvent.objects.create(
+        aggregate_type=aggregate_type, aggregate_id=aggregate_id, event_type=event_type, payload=payload or {}
+    )
+
+
+def record_events(events):
+    """
+    Append many (aggregate_type, aggregate_id, event_type, payload) events with one INSERT.
+    """
+    return OutboxEvent.objects.bulk_create([
+        OutboxEvent(aggregate_type=aggregate_type, aggregate_id=aggregate_id, event_type=event_type, payload=payload)
+        for aggregate_type, aggregate_id, event_type, payload in events
+    ])
+
+
+def encode(message):
+    return json.dumps(message, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+class FileSink:
+    """
+    Append events as JSON lines to a local file, synced to disk per batch.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.OUTBOX_FILE_PATH
+
+    def send(self, messages):
+        try:
+            with open(self.path, 'a') as output:
+                output.write(''.join(encode(message) + '\n' for message in messages))
+                output.flush()
+                os.fsync(output.fileno())
+        except OSError as e:
+            raise SinkError(f"Cannot write {self.path}: {e}")
+
+
+class WebhookSink:
+    """
+    POST each batch as {"events": [...]} to a webhook; any non-2xx answer
+    fails the batch.
+    """
+
+    def __init__(self, url=None, timeout=None):
+        self.url = url or settings.OUTBOX_WEBHOOK_URL
+        self.timeout = timeout or settings.OUTBOX_WEBHOOK_TIMEOUT
+
+    def send(self, messages):
+        request = urllib.request.Request(
+            self.url,
+            data=encode({'events': messages}).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except (urllib.error.URLError, OSError) as e:
+            raise SinkError(f"POST {self.url} failed: {e}")
+
+
+SINKS = {
+    'file': FileSink,
+    'webhook': WebhookSink,
+}
+
+
+@contextmanager
+def relay_lock(connection):
+    """
+    Hold the relay's session-level advisory lock (PostgreSQL) while the
+    block runs; raise RelayBusy when another relay holds it.
+    """
+    if connection.vendor != 'postgresql':
+        yield
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_lock(%s)', [RELAY_LOCK_ID])
+        if not cursor.fetchone()[0]:
+            raise RelayBusy("Another relay is delivering the outbox.")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [RELAY_LOCK_ID])
+
+
+def relay_batch(sink, batch_size, using=DEFAULT_DB_ALIAS):
+    """
+    Deliver the oldest undelivered events to `sink`, in id order, and mark
+    them delivered. Return the events delivered (empty when the outbox is
+    drained).
+
+    The sink is called outside any transaction, so a slow sink holds no
+    row locks or snapshot. Events are marked only after the sink accepted
+    them, so a crash in between delivers them again (at least once). A
+    failed batch is retried as a whole by the next call, which keeps each
+    aggregate's events in order.
+    """
+    outbox = OutboxEvent.objects.using(using)
+    with relay_lock(connections[using]):
+        events = list(outbox.filter(delivered_at__isnull=True).order_by('id')[:batch_size])
+        if not events:
+            return []
+
+        ids = [event.id for event in events]
+        try:
+            sink.send([event.as_message() for event in events])
+        except SinkError as e:
+            outbox.filter(pk__in=ids).update(attempts=models.F('attempts') + 1, last_error=str(e)[:1000])
+            raise
+
+        outbox.filter(pk__in=ids).update(delivered_at=timezone.now())
+        return events
+
+
+def prune_delivered(days, batch_size=1000):
+    """
+    Delete events delivered more than `days` days ago, in batches.
+    Return the number deleted.
+    """
+    before = timezone.now() - timedelta(days=days)
+    deleted = 0
+    while True:
+        ids = list(
+            OutboxEvent.objects.filter(delivered_at__lt=before)
+            .order_by('delivered_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += OutboxEvent.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,205 @@
+"""
+Script Name : stream.py
+Description : Per-process fan-out of availability and dashboard deltas to SSE subscribers
+Author      : @tonybnya
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Max, Q
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# products below this available quantity are flagged, as in ProductViewSet.low_stock
+LOW_STOCK_THRESHOLD = 10
+
+# dashboard counters moved by each order event: (from status, to status)
+ORDER_TRANSITIONS = {
+    'order.confirmed': ('draft', 'confirmed'),
+    'order.cancelled': ('confirmed', 'cancelled'),
+}
+# dashboard amount of each status
+STATUS_AMOUNTS = {'draft': 'pending_revenue', 'confirmed': 'total_revenue'}
+
+
+class Subscription:
+    """
+    One client of the hub: a bounded queue of (topic, id, data) messages.
+    """
+
+    def __init__(self, topics=None, product_ids=None):
+        self.topics = topics
+        self.product_ids = product_ids
+        self.queue = asyncio.Queue(maxsize=settings.SSE_QUEUE_SIZE)
+
+    def wants(self, topic, data):
+        if self.topics and topic not in self.topics:
+            return False
+        if topic == 'availability' and self.product_ids:
+            return data['product_id'] in self.product_ids
+        return True
+
+
+class EventHub:
+    """
+    Polls the outbox once for the whole process and turns new events into
+    availability and dashboard deltas, computed once per batch whatever the
+    number of subscribers. Polling stops when the last subscriber leaves.
+
+    A subscriber too slow to keep up gets a `resync` message and is dropped;
+    its client reconnects and reloads the full state from the REST API.
+
+    Ids skipped by the cursor are kept as `gaps` (id: deadline) and polled
+    again for SSE_GAP_GRACE seconds: an outbox id is allocated before its
+    transaction commits, so a lower id can become visible after higher ones.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.last_id = None
+        self.gaps = {}
+        self.task = None
+
+    def subscribe(self, **filters):
+        subscription = Subscription(**filters)
+        self.subscribers.add(subscription)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+
+    async def run(self):
+        if self.last_id is None:
+            # new subscribers get changes from now on, not the history
+            self.last_id = await sync_to_async(latest_event_id)()
+        while self.subscribers:
+            try:
+                messages, self.last_id = await sync_to_async(changes_since, thread_sensitive=False)(
+                    self.last_id, self.gaps
+                )
+            except Exception:
+                logger.exception("Event stream: cannot read the outbox")
+                messages = []
+            for message in messages:
+                self.publish(*message)
+            if not messages:
+                await asyncio.sleep(settings.SSE_POLL_INTERVAL)
+        # nobody listens any more: the next subscriber starts from its own "now"
+        self.last_id = None
+        self.gaps = {}
+
+    def publish(self, topic, event_id, data):
+        for subscription in list(self.subscribers):
+            if not subscription.wants(topic, data):
+                continue
+            try:
+                subscription.queue.put_nowait((topic, event_id, data))
+            except asyncio.QueueFull:
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(('resync', event_id, {}))
+                self.unsubscribe(subscription)
+
+
+hub = EventHub()
+
+
+def latest_event_id():
+    close_old_connections()
+    return OutboxEvent.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def changes_since(last_id, gaps):
+    """
+    Read the events after `last_id` and those of the `gaps` (one batch) and
+    return the messages to push, [(topic, event_id, data)], with the new
+    last id. `gaps` is updated in place: ids skipped are added with a
+    deadline, ids found or past their deadline removed. Availability of the
+    products touched and the amounts of the orders touched are read with one
+    query each.
+    """
+    from apps.products.models import Product
+    from apps.sales.pricing import get_pricing_settings, order_subtotals
+
+    close_old_connections()
+    now = time.monotonic()
+    for event_id, deadline in list(gaps.items()):
+        if deadline < now:
+            # rolled back (or never committed): the id will not show up
+            del gaps[event_id]
+    events = list(
+        OutboxEvent.objects.filter(Q(id__gt=last_id) | Q(id__in=list(gaps))).order_by('id')
+        .values_list('id', 'aggregate_type', 'aggregate_id', 'event_type')[:settings.SSE_BATCH_SIZE]
+    )
+    if not events:
+        return [], last_id
+
+    expected = last_id + 1
+    for event_id, *_ in events:
+        gaps.pop(event_id, None)
+        if event_id > last_id:
+            # ids between the previous event and this one are not visible yet;
+            # a longer run than a batch is not in-flight transactions (e.g. the
+            # sequence moved past pruned events), only its tail is awaited
+            for missing in range(max(expected, event_id - settings.SSE_BATCH_SIZE), event_id):
+                gaps[missing] = now + settings.SSE_GAP_GRACE
+            expected = event_id + 1
+    last_id = max(last_id, events[-1][0])
+
+    # latest event of each product, oldest first
+    products = {}
+    orders = []
+    for event_id, aggregate_type, aggregate_id, event_type in events:
+        if aggregate_type == 'product':
+            products.pop(aggregate_id, None)
+            products[aggregate_id] = event_id
+        elif event_type in ORDER_TRANSITIONS:
+            orders.append((event_id, aggregate_id, event_type))
+
+    messages = []
+    if products:
+        levels = Product.objects.filter(pk__in=list(products)).with_reserved().values_list(
+            'id', 'quantity_on_hand', 'reserved_qty', 'forecasted_quantity'
+        )
+        levels = {row[0]: row[1:] for row in levels}
+        for product_id, event_id in products.items():
+            if product_id not in levels:
+                continue
+            on_hand, reserved, forecasted = levels[product_id]
+            messages.append(('availability', event_id, {
+                'product_id': product_id,
+                'quantity_on_hand': on_hand,
+                'reserved_quantity': reserved,
+                'available_quantity': on_hand - reserved,
+                'forecasted_quantity': forecasted,
+                'low_stock': on_hand - reserved < LOW_STOCK_THRESHOLD,
+            }))
+
+    if orders:
+        options = get_pricing_settings()
+        subtotals = {
+            order_id: subtotal.quantize(options['QUANTUM'], rounding=options['ROUNDING'])
+            for order_id, subtotal in order_subtotals([order_id for _, order_id, _ in orders]).items()
+        }
+        for event_id, order_id, event_type in orders:
+            delta = defaultdict(int)
+            source, target = ORDER_TRANSITIONS[event_type]
+            delta[f'{source}_orders'] -= 1
+            delta[f'{target}_orders'] += 1
+            if source in STATUS_AMOUNTS:
+                delta[STATUS_AMOUNTS[source]] -= subtotals[order_id]
+            if target in STATUS_AMOUNTS:
+                delta[STATUS_AMOUNTS[target]] += subtotals[order_id]
+            messages.append(('dashboard', event_id, {'order_id': order_id, 'event': event_type, 'delta': dict(delta)}))
+
+    messages.sort(key=lambda message: message[1])
+    return messages, last_id
@@ -0,0 +1,12 @@
+"""
+Script Name : urls.py
+Description : Define routes for Events
+Author      : @tonybnya
+"""
+from django.urls import path
+
+from .views import stream
+
+urlpatterns = [
+    path('events/stream/', stream, name='event-stream'),
+]
@@ -0,0 +1,93 @@
+"""
+Script Name : views.py
+Description : Server-sent events endpoint streaming availability and dashboard deltas
+Author      : @tonybnya
+"""
+import asyncio
+import json
+import time
+
+from apps.authentication.authentication import StatelessJWTAuthentication
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .stream import hub
+
+TOPICS = {'availability', 'dashboard'}
+
+
+def authenticate(request):
+    """
+    Return the user of the access token sent as "Authorization: Bearer ..."
+    or, for EventSource clients that cannot set headers, as ?token=...
+    The token is checked from its claims, plus the (cached) is_active flag of
+    its user.
+    """
+    authentication = StatelessJWTAuthentication()
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    raw_token = header.split(' ', 1)[1] if header.startswith('Bearer ') else request.GET.get('token')
+    if not raw_token:
+        raise AuthenticationFailed("Authentication credentials were not provided.")
+    return authentication.get_user(authentication.get_validated_token(raw_token.encode()))
+
+
+def format_message(topic, event_id, data):
+    return f"id: {event_id}\nevent: {topic}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def event_stream(subscription):
+    """
+    Yield the subscription's messages as SSE frames, with keep-alive
+    comments. The stream ends after SSE_MAX_DURATION seconds (the browser
+    reconnects after `retry`), so streams of vanished clients are reclaimed.
+    """
+    deadline = time.monotonic() + settings.SSE_MAX_DURATION
+    try:
+        yield "retry: 3000\n\n"
+        while time.monotonic() < deadline:
+            try:
+                topic, event_id, data = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=settings.SSE_KEEPALIVE
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_message(topic, event_id, data)
+            if topic == 'resync':
+                break
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def stream(request):
+    """
+    Push availability and dashboard deltas as server-sent events.
+    ?topics=availability,dashboard restricts the topics, ?products=1,2 the
+    products whose availability is pushed.
+    """
+    # require_GET does not wrap async views on Django 4.2
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    try:
+        await sync_to_async(authenticate)(request)
+    except (AuthenticationFailed, InvalidToken, TokenError) as e:
+        return JsonResponse({'error': str(e)}, status=401)
+
+    topics = {topic for topic in request.GET.get('topics', '').split(',') if topic}
+    if topics - TOPICS:
+        return JsonResponse({'error': f"Unknown topics: {sorted(topics - TOPICS)}"}, status=400)
+    try:
+        product_ids = {int(pk) for pk in request.GET.get('products', '').split(',') if pk}
+    except ValueError:
+        return JsonResponse({'error': 'products must be comma-separated ids.'}, status=400)
+
+    subscription = hub.subscribe(topics=topics, product_ids=product_ids)
+    response = StreamingHttpResponse(event_stream(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # no buffering by nginx-like proxies
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,29 @@
+"""
+Script Name : filters.py
+Description : Filters for the Inventory app
+Author      : @tonybnya
+"""
+import django_filters
+from apps.sales.models import SalesOrder
+
+from .models import Reservation
+
+
+class ReservationFilter(django_filters.FilterSet):
+    """
+    Reservation filters, by order status set, dates and quantity range.
+    Date bounds compare the raw columns so their indexes are used.
+    """
+    order__status = django_filters.MultipleChoiceFilter(choices=SalesOrder.STATUS_CHOICES, distinct=False)
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+    updated_after = django_filters.IsoDateTimeFilter(field_name='updated_at', lookup_expr='gte')
+    updated_before = django_filters.IsoDateTimeFilter(field_name='updated_at', lookup_expr='lt')
+    expires_after = django_filters.IsoDateTimeFilter(field_name='expires_at', lookup_expr='gte')
+    expires_before = django_filters.IsoDateTimeFilter(field_name='expires_at', lookup_expr='lt')
+    min_qty = django_filters.NumberFilter(field_name='qty', lookup_expr='gte')
+    max_qty = django_filters.NumberFilter(field_name='qty', lookup_expr='lte')
+
+    class Meta:
+        model = Reservation
+        fields = ['order', 'product', 'order__status', 'order__customer']
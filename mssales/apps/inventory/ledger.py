@@ -0,0 +1,223 @@
+"""
+Script Name : ledger.py
+Description : Stock ledger, snapshots and point-in-time availability
+Author      : @tonybnya
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from apps.events.outbox import record_events
+from apps.products.models import Product
+from django.db.models import (Case, F, IntegerField, Max, OuterRef, Q,
+                              Subquery, Sum, Value, When)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Reservation, StockMove, StockSnapshot
+
+# moves younger than this are left to the next snapshot, so that
+# transactions still in flight cannot slip below a snapshot boundary
+SNAPSHOT_SETTLE_DELAY = timedelta(seconds=60)
+
+# products handled per query when taking snapshots or reading history
+BATCH_SIZE = 500
+
+
+def record_moves(moves):
+    """
+    Append moves to the ledger.
+    `moves` is an iterable of dicts with product, kind, on_hand_delta,
+    reserved_delta and optionally order.
+    """
+    entries = [
+        StockMove(
+            product_id=move['product'],
+            order_id=move.get('order'),
+            kind=move['kind'],
+            on_hand_delta=move.get('on_hand_delta', 0),
+            reserved_delta=move.get('reserved_delta', 0)
+        )
+        for move in moves
+    ]
+    # same transaction as the stock change
+    record_events(
+        ('product', int(entry.product_id), f'stock.{entry.kind}', {
+            'product_id': int(entry.product_id),
+            'order_id': entry.order_id,
+            'on_hand_delta': entry.on_hand_delta,
+            'reserved_delta': entry.reserved_delta,
+        })
+        for entry in entries
+    )
+    return StockMove.objects.bulk_create(entries)
+
+
+def shift_forecast(deltas):
+    """
+    Shift forecasted_quantity (on hand - reserved) by per-product deltas
+    using one UPDATE.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    delta_case = Case(
+        *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+    return Product.objects.filter(pk__in=deltas).update(
+        forecasted_quantity=F('forecasted_quantity') + delta_case
+    )
+
+
+def record_reservations(order_id, quantities, release=False):
+    """
+    Ledger and forecast bookkeeping for reservations created or released.
+    `quantities` maps product id to reserved qty.
+    """
+    record_reservation_rows(
+        [(order_id, product_id, qty) for product_id, qty in quantities.items()],
+        release=release
+    )
+
+
+def record_reservation_rows(rows, release=False):
+    """
+    Same as record_reservations for (order_id, product_id, qty) rows spanning
+    many orders, e.g. a batch of expired reservations.
+    """
+    sign = -1 if release else 1
+    record_moves(
+        {
+            'product': product_id,
+            'order': order_id,
+            'kind': 'release' if release else 'reserve',
+            'reserved_delta': sign * qty
+        }
+        for order_id, product_id, qty in rows
+    )
+
+    forecast = defaultdict(int)
+    for order_id, product_id, qty in rows:
+        forecast[product_id] -= sign * qty
+    shift_forecast(forecast)
+
+
+def sync_forecasted_quantity(product_ids=None):
+    """
+    Recompute forecasted_quantity from on-hand stock and open reservations
+    with a single correlated UPDATE.
+    Expired reservations still count until the sweeper releases them, as in
+    the ledger.
+    """
+    reserved = Reservation.objects.filter(product=OuterRef('pk')).order_by().values('product').annotate(
+        total=Sum('qty')
+    ).values('total')
+
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+
+    return products.update(
+        forecasted_quantity=F('quantity_on_hand') - Coalesce(Subquery(reserved), 0)
+    )
+
+
+def latest_snapshots(product_ids, at=None):
+    """
+    Return {product_id: StockSnapshot} with the latest snapshot taken at or
+    before `at` for each product.
+    """
+    snapshots = StockSnapshot.objects.filter(product=OuterRef('pk'))
+    if at is not None:
+        snapshots = snapshots.filter(taken_at__lte=at)
+
+    snapshot_ids = Product.objects.filter(pk__in=product_ids).annotate(
+        snapshot_id=Subquery(snapshots.order_by('-taken_at', '-id').values('id')[:1])
+    ).exclude(snapshot_id=None).values_list('snapshot_id', flat=True)
+
+    return {
+        snapshot.product_id: snapshot
+        for snapshot in StockSnapshot.objects.filter(pk__in=list(snapshot_ids))
+    }
+
+
+def stock_at(product_ids, at=None, upto_move_id=None):
+    """
+    Return {product_id: {'on_hand', 'reserved', 'available'}} as of `at`.
+    Each value is the latest snapshot plus the moves recorded after it, so
+    only a bounded slice of the ledger is read.
+    """
+    product_ids = list(product_ids)
+    result = {}
+
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        chunk = product_ids[start:start + BATCH_SIZE]
+        snapshots = latest_snapshots(chunk, at)
+
+        since_snapshot = Q(product_id__in=[pk for pk in chunk if pk not in snapshots])
+        for product_id, snapshot in snapshots.items():
+            since_snapshot |= Q(product_id=product_id, id__gt=snapshot.last_move_id)
+
+        moves = StockMove.objects.filter(since_snapshot)
+        if at is not None:
+            moves = moves.filter(created_at__lte=at)
+        if upto_move_id is not None:
+            moves = moves.filter(id__lte=upto_move_id)
+
+        deltas = defaultdict(lambda: (0, 0))
+        for row in moves.order_by().values('product_id').annotate(
+            on_hand=Sum('on_hand_delta'), reserved=Sum('reserved_delta')
+        ):
+            deltas[row['product_id']] = (row['on_hand'], row['reserved'])
+
+        for product_id in chunk:
+            snapshot = snapshots.get(product_id)
+            on_hand, reserved = deltas[product_id]
+            if snapshot is not None:
+                on_hand += snapshot.on_hand
+                reserved += snapshot.reserved
+            result[product_id] = {
+                'on_hand': on_hand,
+                'reserved': reserved,
+                'available': on_hand - reserved
+            }
+
+    return result
+
+
+def take_snapshots():
+    """
+    Snapshot every product that has ledger moves since its last snapshot.
+    Returns the number of snapshots created.
+    """
+    taken_at = timezone.now() - SNAPSHOT_SETTLE_DELAY
+    last_move_id = StockMove.objects.filter(created_at__lte=taken_at).aggregate(last=Max('id'))['last']
+    if last_move_id is None:
+        return 0
+
+    # every run snapshots all products moved since the previous run's boundary
+    previous_move_id = StockSnapshot.objects.aggregate(last=Max('last_move_id'))['last'] or 0
+    if last_move_id <= previous_move_id:
+        return 0
+    product_ids = list(
+        StockMove.objects.filter(id__gt=previous_move_id, id__lte=last_move_id)
+        .order_by().values_list('product_id', flat=True).distinct()
+    )
+
+    created = 0
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        chunk = product_ids[start:start + BATCH_SIZE]
+        levels = stock_at(chunk, upto_move_id=last_move_id)
+        StockSnapshot.objects.bulk_create([
+            StockSnapshot(
+                product_id=product_id,
+                taken_at=taken_at,
+                last_move_id=last_move_id,
+                on_hand=level['on_hand'],
+                reserved=level['reserved']
+            )
+            for product_id, level in levels.items()
+        ])
+        created += len(chunk)
+    return created
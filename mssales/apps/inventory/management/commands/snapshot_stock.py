@@ -0,0 +1,29 @@
+"""
+Script Name : snapshot_stock.py
+Description : Take periodic per-product stock snapshots from the ledger
+Author      : @tonybnya
+"""
+import time
+
+from apps.inventory.ledger import sync_forecasted_quantity, take_snapshots
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Snapshot the stock of every product moved since the last run (schedule it, e.g. hourly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sync-forecast',
+            action='store_true',
+            help="Also recompute forecasted_quantity from on-hand stock and open reservations."
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = take_snapshots()
+        self.stdout.write(f"{created} snapshot(s) taken in {time.monotonic() - started:.2f}s")
+
+        if options['sync_forecast']:
+            updated = sync_forecasted_quantity()
+            self.stdout.write(f"forecasted_quantity synced for {updated} product(s)")
@@ -0,0 +1,64 @@
+"""
+Script Name : sweep_reservations.py
+Description : Release expired reservations in batched deletes
+Author      : @tonybnya
+"""
+import logging
+import time
+
+from apps.inventory.ledger import record_reservation_rows
+from apps.inventory.models import Reservation
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Release reservations past their expires_at (schedule it, e.g. every minute)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Reservations deleted per statement.")
+        parser.add_argument('--max-batches', type=int, default=0, help="Stop after this many batches (0: no limit).")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        max_batches = options['max_batches']
+        now = timezone.now()
+
+        started = time.monotonic()
+        released = batches = 0
+        while not max_batches or batches < max_batches:
+            count = self.sweep_batch(now, batch_size)
+            if not count:
+                break
+            released += count
+            batches += 1
+
+        elapsed = time.monotonic() - started
+        rate = released / elapsed if elapsed else 0
+        message = f"{released} expired reservation(s) released in {batches} batch(es), {elapsed:.2f}s ({rate:.0f}/s)"
+        logger.info(message)
+        self.stdout.write(message)
+
+    def sweep_batch(self, now, batch_size):
+        """
+        Delete one batch of expired reservations and release their stock in the
+        ledger and forecasted_quantity, in one transaction.
+        """
+        with transaction.atomic():
+            # walks reservations_expires_at_idx; rows locked by a concurrent
+            # cancel are left for the next batch
+            rows = list(
+                Reservation.objects.expired(now)
+                .select_for_update(skip_locked=True)
+                .order_by('expires_at')
+                .values_list('id', 'order_id', 'product_id', 'qty')[:batch_size]
+            )
+            if not rows:
+                return 0
+
+            Reservation.objects.filter(pk__in=[row[0] for row in rows]).delete()
+            record_reservation_rows([row[1:] for row in rows], release=True)
+        return len(rows)
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:15
+
+from django.db import migrations, models
+import django.db.models.functions
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def open_ledger(apps, schema_editor):
+    """
+    Opening snapshot per product, and forecasted_quantity aligned with it.
+    """
+    Product = apps.get_model('products', 'Product')
+    Reservation = apps.get_model('inventory', 'Reservation')
+    StockSnapshot = apps.get_model('inventory', 'StockSnapshot')
+
+    reserved = dict(
+        Reservation.objects.order_by().values('product').annotate(total=models.Sum('qty')).values_list('product', 'total')
+    )
+    taken_at = django.utils.timezone.now()
+    snapshots = []
+    for product_id, on_hand in Product.objects.values_list('id', 'quantity_on_hand').iterator():
+        snapshots.append(StockSnapshot(
+            product_id=product_id,
+            taken_at=taken_at,
+            last_move_id=0,
+            on_hand=on_hand,
+            reserved=reserved.get(product_id, 0)
+        ))
+        if len(snapshots) >= 1000:
+            StockSnapshot.objects.bulk_create(snapshots)
+            snapshots = []
+    StockSnapshot.objects.bulk_create(snapshots)
+
+    reserved_subquery = Reservation.objects.filter(product=models.OuterRef('pk')).order_by().values('product').annotate(
+        total=models.Sum('qty')
+    ).values('total')
+    Product.objects.update(
+        forecasted_quantity=models.F('quantity_on_hand') - models.functions.Coalesce(models.Subquery(reserved_subquery), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_remove_product_activity_exception_decoration_and_more'),
+        ('sales', '0001_initial'),
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('last_move_id', models.BigIntegerField(default=0)),
+                ('on_hand', models.IntegerField()),
+                ('reserved', models.IntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='products.product')),
+            ],
+            options={
+                'db_table': 'stock_snapshots',
+                'indexes': [models.Index(fields=['product', 'taken_at'], name='stock_snapshots_product_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMove',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('receive', 'Receive'), ('adjust', 'Adjust'), ('ship', 'Ship'), ('reserve', 'Reserve'), ('release', 'Release')], max_length=20)),
+                ('on_hand_delta', models.IntegerField(default=0)),
+                ('reserved_delta', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_moves', to='sales.salesorder')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_moves', to='products.product')),
+            ],
+            options={
+                'db_table': 'stock_moves',
+                'indexes': [models.Index(fields=['product', 'id'], name='stock_moves_product_id_idx'), models.Index(fields=['created_at'], name='stock_moves_created_at_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,30 @@ Author      : @tonybnya
 """
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
+
+
+class ReservationQuerySet(models.QuerySet):
+    def active(self, at=None):
+        """
+        Reservations still holding stock at `at` (default: now).
+        """
+        return self.filter(models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=at or timezone.now()))
+
+    def expired(self, at=None):
+        """
+        Reservations whose TTL has elapsed at `at` (default: now).
+        """
+        return self.filter(expires_at__lte=at or timezone.now())
+
+    def reserved_by_product(self, product_ids):
+        """
+        Return {product_id: reserved qty} for `product_ids` with one grouped query.
+        """
+        rows = self.filter(product_id__in=product_ids).order_by().values('product_id').annotate(
+            total=models.Sum('qty')
+        ).values_list('product_id', 'total')
+        return dict(rows)
 
 
 class Reservation(models.Model):
@@ -16,13 +40,83 @@ class Reservation(models.Model):
     product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='reservations')
 
     qty = models.IntegerField(validators=[MinValueValidator(1)])
+    # null means the reservation never expires
+    expires_at = models.DateTimeField(blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ReservationQuerySet.as_manager()
+
     class Meta:
         db_table = 'reservations'
         unique_together = ['order', 'product']
+        indexes = [
+            # sweeper: expires_at <= now, oldest first
+            models.Index(fields=['expires_at'], name='reservations_expires_at_idx'),
+            # availability: product_id = ? AND (expires_at IS NULL OR expires_at > now)
+            models.Index(fields=['product', 'expires_at'], name='reservations_product_exp_idx'),
+            models.Index(fields=['created_at'], name='reservations_created_at_idx'),
+        ]
 
     def __str__(self):
         return f"Reserved: {self.qty} x {self. product.name} for {self.order.number}"
+
+
+class StockMove(models.Model):
+    """
+    Modelisation of a StockMove.
+    Append-only ledger entry changing on-hand and/or reserved stock.
+    """
+    KIND_CHOICES = [
+        ('receive', 'Receive'),
+        ('adjust', 'Adjust'),
+        ('ship', 'Ship'),
+        ('reserve', 'Reserve'),
+        ('release', 'Release')
+    ]
+
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='stock_moves')
+    order = models.ForeignKey(
+        'sales.SalesOrder', on_delete=models.SET_NULL, blank=True, null=True, related_name='stock_moves'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+
+    on_hand_delta = models.IntegerField(default=0)
+    reserved_delta = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'stock_moves'
+        indexes = [
+            # snapshot + bounded delta lookups: product_id = ? AND id > ?
+            models.Index(fields=['product', 'id'], name='stock_moves_product_id_idx'),
+            models.Index(fields=['created_at'], name='stock_moves_created_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.on_hand_delta:+d} on hand, {self.reserved_delta:+d} reserved"
+
+
+class StockSnapshot(models.Model):
+    """
+    Modelisation of a StockSnapshot.
+    Per-product stock level including every move up to last_move_id.
+    """
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='stock_snapshots')
+
+    taken_at = models.DateTimeField()
+    last_move_id = models.BigIntegerField(default=0)
+
+    on_hand = models.IntegerField()
+    reserved = models.IntegerField()
+
+    class Meta:
+        db_table = 'stock_snapshots'
+        indexes = [
+            models.Index(fields=['product', 'taken_at'], name='stock_snapshots_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.taken_at}: {self.on_hand} on hand, {self.reserved} reserved"
@@ -3,12 +3,13 @@ Script Name : serializers.py
 Description : Serializers of the Reservations
 Author      : @tonybnya
 """
+from apps.tracing import TracedSerializerMixin
 from rest_framework import serializers
 
 from .models import Reservation
 
 
-class ReservationSerializer(serializers.ModelSerializer):
+class ReservationSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer of the Reservation.
     """
@@ -22,7 +23,7 @@ class ReservationSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'order', 'order_number', 'customer_name',
             'product', 'product_name', 'product_reference',
-            'qty', 'created_at', 'updated_at'
+            'qty', 'expires_at', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
@@ -38,3 +39,35 @@ class InventoryStatusSerializer(serializers.Serializer):
     total_reserved = serializers.IntegerField()
     available_quantity = serializers.IntegerField()
     reservations_count = serializers.IntegerField()
+
+
+class StockMovementSerializer(serializers.Serializer):
+    """
+    Serializer of a single stock movement (receive, adjust or ship).
+    """
+    qty = serializers.IntegerField()
+    version = serializers.IntegerField(required=False, min_value=0)
+
+    def validate(self, data):
+        kind = self.context.get('kind')
+        if kind in ('receive', 'ship') and data['qty'] <= 0:
+            raise serializers.ValidationError("Quantity must be positive.")
+        if kind == 'adjust' and data['qty'] == 0:
+            raise serializers.ValidationError("Adjustment quantity cannot be zero.")
+        return data
+
+
+class StockMovementBatchItemSerializer(serializers.Serializer):
+    """
+    Serializer of one movement inside a batch.
+    """
+    product = serializers.IntegerField(min_value=1)
+    kind = serializers.ChoiceField(choices=['receive', 'adjust', 'ship'])
+    qty = serializers.IntegerField()
+
+    def validate(self, data):
+        if data['kind'] in ('receive', 'ship') and data['qty'] <= 0:
+            raise serializers.ValidationError("Quantity must be positive.")
+        if data['kind'] == 'adjust' and data['qty'] == 0:
+            raise serializers.ValidationError("Adjustment quantity cannot be zero.")
+        return data
@@ -0,0 +1,143 @@
+"""
+Script Name : stock.py
+Description : Atomic stock movements (receive, adjust, ship) on products
+Author      : @tonybnya
+"""
+from collections import defaultdict
+
+from apps.products.models import Product
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .ledger import record_moves
+
+MOVEMENT_KINDS = ('receive', 'adjust', 'ship')
+
+# products updated per UPDATE statement when applying a batch
+BATCH_SIZE = 400
+
+
+class InsufficientStock(ValueError):
+    """
+    Raised when a movement would bring quantity_on_hand below zero.
+    """
+
+
+class StaleVersion(ValueError):
+    """
+    Raised when a version-checked update finds a newer product version.
+    """
+
+
+def movement_delta(kind, qty):
+    """
+    Convert a movement into a signed quantity_on_hand delta.
+    """
+    if kind not in MOVEMENT_KINDS:
+        raise ValueError(f"Unknown stock movement: {kind}")
+    if kind == 'adjust':
+        if qty == 0:
+            raise ValueError("Adjustment quantity cannot be zero")
+        return qty
+    if qty <= 0:
+        raise ValueError("Quantity must be positive")
+    return qty if kind == 'receive' else -qty
+
+
+def apply_movement(product_id, kind, qty, expected_version=None):
+    """
+    Apply one movement with a single conditional UPDATE and record it in the
+    ledger. The row is changed only if the stock stays non-negative and, when
+    given, the product is still at `expected_version`.
+    """
+    delta = movement_delta(kind, qty)
+
+    filters = {'pk': product_id}
+    if delta < 0:
+        filters['quantity_on_hand__gte'] = -delta
+    if expected_version is not None:
+        filters['version'] = expected_version
+
+    with transaction.atomic():
+        updated = Product.objects.filter(**filters).update(
+            quantity_on_hand=F('quantity_on_hand') + delta,
+            forecasted_quantity=F('forecasted_quantity') + delta,
+            version=F('version') + 1,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            _raise_for_rejected(product_id, delta, expected_version)
+        record_moves([{'product': product_id, 'kind': kind, 'on_hand_delta': delta}])
+    return delta
+
+
+def apply_movements(movements):
+    """
+    Apply many movements at once.
+    Deltas are summed per product and written with one CASE-based UPDATE per
+    BATCH_SIZE products, inside a single transaction: either every movement
+    is applied or none is.
+    """
+    movements = list(movements)
+    deltas = defaultdict(int)
+    for movement in movements:
+        deltas[movement['product']] += movement_delta(movement['kind'], movement['qty'])
+
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    product_ids = list(deltas)
+    now = timezone.now()
+
+    with transaction.atomic():
+        for start in range(0, len(product_ids), BATCH_SIZE):
+            chunk = product_ids[start:start + BATCH_SIZE]
+            delta_case = Case(
+                *[When(pk=pk, then=Value(deltas[pk])) for pk in chunk],
+                default=Value(0),
+                output_field=IntegerField()
+            )
+            try:
+                with transaction.atomic():
+                    updated = Product.objects.filter(pk__in=chunk).update(
+                        quantity_on_hand=F('quantity_on_hand') + delta_case,
+                        forecasted_quantity=F('forecasted_quantity') + delta_case,
+                        version=F('version') + 1,
+                        updated_at=now
+                    )
+            except IntegrityError:
+                # the non-negative check constraint rejected the chunk
+                short = Product.objects.filter(pk__in=chunk).values_list('pk', 'name', 'quantity_on_hand')
+                names = [name for pk, name, on_hand in short if on_hand + deltas[pk] < 0]
+                raise InsufficientStock(f"Insufficient stock for {', '.join(names)}")
+
+            if updated != len(chunk):
+                existing = set(Product.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+                missing = sorted(set(chunk) - existing)
+                raise Product.DoesNotExist(f"Products not found: {missing}")
+
+        record_moves(
+            {
+                'product': movement['product'],
+                'kind': movement['kind'],
+                'on_hand_delta': movement_delta(movement['kind'], movement['qty'])
+            }
+            for movement in movements
+        )
+
+    return deltas
+
+
+def _raise_for_rejected(product_id, delta, expected_version):
+    """
+    Explain why a conditional stock UPDATE matched no row.
+    """
+    product = Product.objects.filter(pk=product_id).values('name', 'quantity_on_hand', 'version').first()
+    if product is None:
+        raise Product.DoesNotExist(f"Product {product_id} not found")
+    if expected_version is not None and product['version'] != expected_version:
+        raise StaleVersion(
+            f"Product was modified concurrently (version {product['version']}, expected {expected_version})"
+        )
+    raise InsufficientStock(
+        f"Insufficient stock for {product['name']}. On hand: {product['quantity_on_hand']}, Requested: {-delta}"
+    )
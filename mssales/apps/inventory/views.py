@@ -3,7 +3,9 @@ Script Name : views.py
 Description : Views of the Reservation Model
 Author      : @tonybnya
 """
+from apps.mixins import MultiGetMixin, ReplicaReadMixin, TracingMixin
 from apps.products.models import Product
+from django.db import transaction
 from django.db.models import Sum
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, viewsets
@@ -11,11 +13,13 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from .filters import ReservationFilter
+from .ledger import record_reservations
 from .models import Reservation
 from .serializers import InventoryStatusSerializer, ReservationSerializer
 
 
-class ReservationViewSet(viewsets.ModelViewSet):
+class ReservationViewSet(TracingMixin, MultiGetMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     Reservation View.
     """
@@ -23,9 +27,30 @@ class ReservationViewSet(viewsets.ModelViewSet):
     serializer_class = ReservationSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['order', 'product', 'order__status', 'order__customer']
-    search_fields = ['order__number', 'product__name', 'order__name']
+    filterset_class = ReservationFilter
+    search_fields = ['order__number', 'product__name', 'order__customer__name']
     ordering = ['-created_at']
+    replica_actions = {'list': None, 'inventory_status': 30, 'low_stock_report': 30}
+    throttle_costs = {'inventory_status': 30, 'low_stock_report': 30}
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            reservation = serializer.save()
+            record_reservations(reservation.order_id, {reservation.product_id: reservation.qty})
+
+    def perform_update(self, serializer):
+        """Release the previous reservation and book the new one in the ledger"""
+        previous = serializer.instance
+        released = (previous.order_id, {previous.product_id: previous.qty})
+        with transaction.atomic():
+            reservation = serializer.save()
+            record_reservations(*released, release=True)
+            record_reservations(reservation.order_id, {reservation.product_id: reservation.qty})
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            record_reservations(instance.order_id, {instance.product_id: instance.qty}, release=True)
+            instance.delete()
 
     @action(detail=False, methods=['get'])
     def inventory_status(self, request):
@@ -36,7 +61,7 @@ class ReservationViewSet(viewsets.ModelViewSet):
         inventory_data = []
 
         for product in products:
-            reservations = Reservation.objects.filter(product=product)
+            reservations = Reservation.objects.active().filter(product=product)
             total_reserved = reservations.aggregate(Sum('qty'))['qty__sum'] or 0
             reservations_count = reservations.count()
 
@@ -65,7 +90,7 @@ class ReservationViewSet(viewsets.ModelViewSet):
         low_stock_products = []
         for product in Product.objects.all():
             if product.available_quantity < threshold:
-                reservations = Reservation.objects.filter(product=product)
+                reservations = Reservation.objects.active().filter(product=product)
                 total_reserved = reservations.aggregate(Sum('qty'))['qty__sum'] or 0
                 
                 low_stock_products.append({
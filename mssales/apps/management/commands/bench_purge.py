@@ -0,0 +1,74 @@
+"""
+Script Name : bench_purge.py
+Description : Compare Model.delete() with the chunked purge on a generated customer
+Author      : @tonybnya
+"""
+import time
+import tracemalloc
+
+from apps.customers.models import Customer
+from apps.inventory.models import Reservation
+from apps.products.models import Product
+from apps.purge import BATCH_SIZE, purge_customers
+from apps.sales.models import SalesOrder, SalesOrderLine
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class Command(BaseCommand):
+    help = "Delete two identical generated customers, one with Customer.delete() and one with purge_customers()."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=2000, help="Orders of each generated customer.")
+        parser.add_argument('--lines', type=int, default=5, help="Lines (and reservations) per order.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'Bench purge {i}', internal_reference=f'BENCH-PURGE-{i}',
+                sales_price=10, cost=5, quantity_on_hand=10 ** 6, forecasted_quantity=10 ** 6
+            )
+            for i in range(options['lines'])
+        ])
+
+        try:
+            collector = self.make_customer('collector', products, options['orders'])
+            chunked = self.make_customer('chunked', products, options['orders'])
+            self.stdout.write(
+                f"{options['orders']} orders x {options['lines']} lines and reservations per customer"
+            )
+            self.measure('Customer.delete()', lambda: collector.delete())
+            self.measure('purge_customers()', lambda: purge_customers([chunked.pk], options['batch_size']))
+        finally:
+            Reservation.objects.filter(product__in=products).delete()
+            SalesOrderLine.objects.filter(product__in=products).delete()
+            Product.objects.filter(pk__in=[product.pk for product in products]).delete()
+
+    def make_customer(self, name, products, orders):
+        customer = Customer.objects.create(name=f'Bench purge {name}', email=f'bench-purge-{name}@example.com')
+        created = SalesOrder.objects.bulk_create([
+            SalesOrder(customer=customer, number=f'BENCH-{name}-{i}') for i in range(orders)
+        ])
+        SalesOrderLine.objects.bulk_create([
+            SalesOrderLine(order=order, product=product, qty=1, unit_price=product.sales_price)
+            for order in created for product in products
+        ], batch_size=5000)
+        Reservation.objects.bulk_create([
+            Reservation(order=order, product=product, qty=1)
+            for order in created for product in products
+        ], batch_size=5000)
+        return customer
+
+    def measure(self, label, delete):
+        tracemalloc.start()
+        started = time.monotonic()
+        with CaptureQueriesContext(connection) as queries:
+            delete()
+        elapsed = time.monotonic() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f"{label:<20} {elapsed:8.2f}s  {len(queries):6d} queries  {peak / 2 ** 20:8.1f} MiB peak"
+        )
@@ -0,0 +1,97 @@
+"""
+Script Name : bench_renderers.py
+Description : Render time and bytes on the wire of the API JSON renderers
+Author      : @tonybnya
+"""
+import gzip
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from apps.middleware import brotli
+from apps.renderers import FastJSONRenderer, orjson
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+
+def order_payload(rows):
+    now = timezone.now()
+    return {
+        'count': rows,
+        'next': None,
+        'previous': None,
+        'results': [
+            {
+                'id': i,
+                'number': f'SO-{i:010d}',
+                'customer': i % 50,
+                'customer_name': f'Customer {i % 50}',
+                'status': 'confirmed',
+                'created_at': now - timedelta(minutes=i),
+                'updated_at': now,
+                'lines': [
+                    {
+                        'id': i * 10 + j,
+                        'product': j,
+                        'product_name': f'Product {j}',
+                        'quantity': j + 1,
+                        'unit_price': Decimal('19.99'),
+                        'line_total': Decimal('19.99') * (j + 1),
+                    }
+                    for j in range(5)
+                ],
+                'grand_total': Decimal('299.85'),
+            }
+            for i in range(rows)
+        ],
+    }
+
+
+def inventory_payload(rows):
+    return [
+        {
+            'product_id': i,
+            'product_name': f'Product {i}',
+            'internal_reference': f'REF-{i:06d}',
+            'quantity_on_hand': 100 + i,
+            'reserved_quantity': i % 20,
+            'available_quantity': 100 + i - i % 20,
+            'cost': Decimal('12.50'),
+            'sales_price': Decimal('19.99'),
+        }
+        for i in range(rows)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compare JSONRenderer and FastJSONRenderer on synthetic order and inventory payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed, FastJSONRenderer falls back to JSONRenderer."))
+
+        payloads = {
+            'orders': order_payload(options['rows']),
+            'inventory': inventory_payload(options['rows']),
+        }
+        for name, data in payloads.items():
+            self.stdout.write(f"{name} ({options['rows']} rows)")
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    content = renderer.render(data)
+                elapsed = (time.perf_counter() - started) / options['repeat']
+
+                sizes = [f"raw={len(content)}"]
+                sizes.append(f"gzip={len(gzip.compress(content, settings.COMPRESSION_GZIP_LEVEL))}")
+                if brotli is not None:
+                    sizes.append(f"br={len(brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY))}")
+                self.stdout.write(
+                    f"  {type(renderer).__name__:<18} {elapsed * 1000:8.2f} ms  " + "  ".join(sizes) + " bytes"
+                )
@@ -0,0 +1,85 @@
+"""
+Script Name : check_query_plans.py
+Description : Compare the EXPLAIN plans of the critical querysets with their snapshots
+Author      : @tonybnya
+"""
+from apps.query_plans import (CRITICAL_QUERIES, compare, explain_query, load_snapshots, save_snapshots, seed,
+                              snapshot_path, table_sizes, walk)
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the registered critical querysets (with their prefetches) and compare the normalized "
+        "plans with the snapshots in QUERY_PLAN_SNAPSHOT_DIR; fails on new sequential scans, lost "
+        "indexes, new nested loops over large tables or extra statements. --update rewrites the snapshots."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', help="Registered query names (default: all).")
+        parser.add_argument('--update', action='store_true', help="Store the current plans as the snapshots.")
+        parser.add_argument('--analyze', action='store_true', help="EXPLAIN ANALYZE (PostgreSQL) and show timings.")
+        parser.add_argument(
+            '--seed', type=int, default=0, metavar='ORDERS',
+            help="Generate ORDERS orders (with customers, products, lines and reservations) in a "
+                 "transaction rolled back at the end.",
+        )
+        parser.add_argument('--large-rows', type=int, default=10000, help="Rows from which a table is large.")
+        parser.add_argument('--show', action='store_true', help="Print every plan.")
+
+    def handle(self, *args, **options):
+        names = options['queries'] or list(CRITICAL_QUERIES)
+        unknown = set(names) - set(CRITICAL_QUERIES)
+        if unknown:
+            raise CommandError(f"Unknown queries: {', '.join(sorted(unknown))}")
+
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    seed(options['seed'])
+                results = {name: explain_query(name, options['analyze']) for name in names}
+                sizes = table_sizes()
+                if options['seed']:
+                    raise Rollback()
+        except Rollback:
+            pass
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        snapshots = load_snapshots()
+        if options['update']:
+            snapshots.update({name: summaries for name, (summaries, plans) in results.items()})
+            save_snapshots(snapshots)
+            self.stdout.write(f"Stored {len(results)} plan snapshots in {snapshot_path()}")
+            return
+
+        regressions = 0
+        for name, (summaries, plans) in results.items():
+            if name not in snapshots:
+                self.stdout.write(self.style.WARNING(f"{name}: no snapshot, run with --update"))
+            else:
+                problems = compare(snapshots[name], summaries, sizes, options['large_rows'])
+                regressions += len(problems)
+                if problems:
+                    self.stdout.write(self.style.ERROR(f"{name}: {len(problems)} regression(s)"))
+                    for problem in problems:
+                        self.stdout.write(f"  {problem}")
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+            if options['show'] or options['analyze']:
+                self.show(summaries, plans)
+
+        if regressions:
+            raise CommandError(f"{regressions} query plan regression(s)")
+
+    def show(self, summaries, plans):
+        for summary, plan in zip(summaries, plans):
+            self.stdout.write(f"    {summary['sql']}")
+            for node, depth, _ in walk(plan):
+                timing = f"  ({node['actual_ms']:.3f} ms)" if node.get('actual_ms') is not None else ''
+                self.stdout.write(f"      {'  ' * depth}{node['operation']}{timing}")
@@ -0,0 +1,46 @@
+"""
+Script Name : purge_records.py
+Description : Bulk-delete customers or products in chunked, child-first batches
+Author      : @tonybnya
+"""
+import logging
+import time
+
+from apps.purge import BATCH_SIZE, purge_customers, purge_products
+from django.core.management.base import BaseCommand, CommandError
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete customers (with their orders) or products (with their lines, reservations and stock history) "
+        "in bounded SQL batches instead of Model.delete()."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, nargs='+', default=[], help="Ids of the customers to delete.")
+        parser.add_argument('--products', type=int, nargs='+', default=[], help="Ids of the products to delete.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Rows deleted per statement.")
+
+    def handle(self, *args, **options):
+        if not options['customers'] and not options['products']:
+            raise CommandError("Give --customers and/or --products.")
+
+        started = time.monotonic()
+        counts = {}
+        if options['customers']:
+            counts.update(purge_customers(options['customers'], options['batch_size'], self.progress))
+        if options['products']:
+            for table, count in purge_products(options['products'], options['batch_size'], self.progress).items():
+                counts[table] = counts.get(table, 0) + count
+
+        elapsed = time.monotonic() - started
+        total = sum(counts.values())
+        details = ', '.join(f"{table}: {count}" for table, count in counts.items() if count)
+        message = f"{total} row(s) deleted in {elapsed:.2f}s ({details or 'nothing to delete'})"
+        logger.info(message)
+        self.stdout.write(message)
+
+    def progress(self, table, count):
+        self.stdout.write(f"  {table}: {count} deleted")
@@ -0,0 +1,374 @@
+"""
+Script Name : metrics.py
+Description : In-process metrics registry with Prometheus text exposition
+Author      : @tonybnya
+"""
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: retiring files is not serialized between processes
+    fcntl = None
+
+# seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# totals of the processes that exited, in METRICS_DIR
+RETIRED_FILE = 'retired.json'
+
+
+class Metric:
+    """
+    Base of counters and histograms: values per label tuple, updated under
+    the registry lock (a dict update, no I/O).
+    """
+    kind = None
+
+    def __init__(self, registry, name, documentation, labels=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def key(self, labels):
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def snapshot(self):
+        return {
+            'kind': self.kind,
+            'documentation': self.documentation,
+            'labels': self.labels,
+            'values': [[list(key), value] for key, value in self.values.items()],
+        }
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.registry.lock:
+            # [count per bucket (+Inf last), sum, count]
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self):
+        snapshot = super().snapshot()
+        snapshot['values'] = [[key, [list(counts), total, count]] for key, (counts, total, count) in snapshot['values']]
+        snapshot['buckets'] = self.buckets
+        return snapshot
+
+    def time(self, **labels):
+        return Timer(self, labels)
+
+
+class Timer:
+    """
+    Context manager observing the duration of its block.
+    """
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+def process_start(pid):
+    """
+    Start time of process `pid` in clock ticks since boot (Linux), None when
+    it is unknown or the process does not exist.
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as source:
+            stat = source.read()
+    except OSError:
+        return None
+    # the command name (field 2) may contain spaces; starttime is field 22
+    return stat.rsplit(')', 1)[1].split()[19]
+
+
+def process_alive(identity):
+    """
+    Whether the process that wrote the file `identity` ("<pid>-<start>")
+    still runs; a reused pid has another start time.
+    """
+    pid, _, started = identity.partition('-')
+    current = process_start(pid)
+    if current is not None:
+        return current == started or not started
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        pass
+    return True
+
+
+class Registry:
+    """
+    Metrics of this process. With METRICS_DIR set, each process writes its
+    totals to METRICS_DIR/<pid>-<start>.json at most every
+    METRICS_FLUSH_INTERVAL seconds, and /metrics sums the files of all
+    worker processes. Files of processes that exited are folded into
+    METRICS_DIR/retired.json, so their counts never go away (Prometheus
+    would read a drop as a counter reset) and a recycled pid cannot
+    overwrite them.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.last_flush = 0
+        self._identity = None
+
+    def identity(self):
+        pid = os.getpid()
+        # computed per pid: a registry imported before a fork is shared by the workers
+        if self._identity is None or self._identity[0] != pid:
+            self._identity = (pid, f'{pid}-{process_start(pid) or time.time_ns()}')
+        return self._identity[1]
+
+    def counter(self, name, documentation, labels=()):
+        return self.metrics.setdefault(name, Counter(self, name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(self, name, documentation, labels, buckets))
+
+    def snapshot(self):
+        with self.lock:
+            return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def flush(self, force=False):
+        directory = getattr(settings, 'METRICS_DIR', '')
+        now = time.monotonic()
+        if not directory or (not force and now - self.last_flush < settings.METRICS_FLUSH_INTERVAL):
+            return
+        self.last_flush = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{self.identity()}.json')
+        with open(f'{path}.tmp', 'w') as output:
+            json.dump(self.snapshot(), output)
+        os.replace(f'{path}.tmp', path)
+
+    def collect(self):
+        """
+        Return the snapshots to expose: every process' file, or this
+        process' metrics without METRICS_DIR.
+        """
+        directory = getattr(settings, 'METRICS_DIR', '')
+        if not directory:
+            return [self.snapshot()]
+        self.flush(force=True)
+        self.retire(directory)
+
+        retired = load_retired(directory)
+        snapshots = [retired['metrics']]
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            identity = os.path.basename(path)[:-len('.json')]
+            if identity == RETIRED_FILE[:-len('.json')] or identity in retired['sources']:
+                continue
+            try:
+                with open(path) as source:
+                    snapshots.append(json.load(source))
+            except (OSError, ValueError):
+                # being replaced or removed
+                continue
+        return snapshots
+
+    def retire(self, directory):
+        """
+        Fold the files of exited processes into the retired totals. The
+        folded files are listed in the totals until they are removed, so a
+        crash in between cannot count them twice.
+        """
+        dead = [
+            path for path in glob.glob(os.path.join(directory, '*.json'))
+            if os.path.basename(path) != RETIRED_FILE and not process_alive(os.path.basename(path)[:-len('.json')])
+        ]
+        if not dead:
+            return
+
+        with open(os.path.join(directory, '.retire.lock'), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            retired = load_retired(directory)
+            sources = {
+                identity for identity in retired['sources']
+                if os.path.exists(os.path.join(directory, f'{identity}.json'))
+            }
+            snapshots = [retired['metrics']]
+            folded = []
+            for path in dead:
+                identity = os.path.basename(path)[:-len('.json')]
+                if identity not in sources:
+                    try:
+                        with open(path) as source:
+                            snapshots.append(json.load(source))
+                    except FileNotFoundError:
+                        # retired by another process meanwhile
+                        continue
+                    except ValueError:
+                        pass
+                    sources.add(identity)
+                folded.append(path)
+
+            path = os.path.join(directory, RETIRED_FILE)
+            with open(f'{path}.tmp', 'w') as output:
+                json.dump({'sources': sorted(sources), 'metrics': to_snapshot(merge(snapshots))}, output)
+            os.replace(f'{path}.tmp', path)
+            for path in folded:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+def load_retired(directory):
+    try:
+        with open(os.path.join(directory, RETIRED_FILE)) as source:
+            retired = json.load(source)
+    except (OSError, ValueError):
+        return {'sources': [], 'metrics': {}}
+    retired['sources'] = set(retired['sources'])
+    return retired
+
+
+def merge(snapshots):
+    """
+    Sum the snapshots of several processes.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, 'values': {}})
+            for key, value in metric['values']:
+                key = tuple(key)
+                if metric['kind'] == 'counter':
+                    target['values'][key] = target['values'].get(key, 0) + value
+                else:
+                    current = target['values'].get(key)
+                    if current is None:
+                        target['values'][key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        current[0] = [a + b for a, b in zip(current[0], value[0])]
+                        current[1] += value[1]
+                        current[2] += value[2]
+    return merged
+
+
+def to_snapshot(merged):
+    """
+    Inverse of merge for one total: the snapshot format of Registry.snapshot.
+    """
+    return {
+        name: {**metric, 'values': [[list(key), value] for key, value in metric['values'].items()]}
+        for name, metric in merged.items()
+    }
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def render(merged):
+    """
+    Prometheus text exposition format (0.0.4).
+    """
+    lines = []
+    for name, metric in sorted(merged.items()):
+        lines.append(f"# HELP {name} {metric['documentation']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        for key, value in sorted(metric['values'].items()):
+            if metric['kind'] == 'counter':
+                lines.append(f"{name}{format_labels(metric['labels'], key)} {value}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip([*metric['buckets'], '+Inf'], counts):
+                cumulative += bucket_count
+                labels = format_labels(metric['labels'], key, [('le', bound)])
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(metric['labels'], key)} {total}")
+            lines.append(f"{name}_count{format_labels(metric['labels'], key)} {count}")
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Expose the metrics of all worker processes for Prometheus. When
+    METRICS_TOKEN is set, scrapers must send it as a Bearer token.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.META.get('HTTP_AUTHORIZATION') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    return HttpResponse(render(merge(registry.collect())), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+registry = Registry()
+atexit.register(registry.flush, force=True)
+
+# API
+REQUESTS = registry.counter(
+    'http_requests_total', 'HTTP requests by handler, method and status.', ['handler', 'method', 'status']
+)
+REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds', 'Time to produce the response, by handler and method.', ['handler', 'method']
+)
+DB_QUERIES = registry.counter('db_queries_total', 'SQL queries run by handler.', ['handler', 'database'])
+DB_QUERY_DURATION = registry.counter(
+    'db_query_duration_seconds_total', 'Time spent in SQL queries by handler.', ['handler', 'database']
+)
+CACHE_REQUESTS = registry.counter(
+    'cache_requests_total', 'In-process cache lookups by cache and result.', ['cache', 'result']
+)
+
+# Domain
+ORDER_TRANSITIONS = registry.counter(
+    'sales_order_transitions_total', 'Sales orders confirmed or cancelled.', ['transition']
+)
+RESERVATION_CONFLICTS = registry.counter(
+    'reservation_conflicts_total', 'Insufficient stock errors, by where they were detected.', ['source']
+)
+CONFIRM_DURATION = registry.histogram('sales_order_confirm_duration_seconds', 'Time to confirm a sales order.')
@@ -0,0 +1,236 @@
+"""
+Script Name : middleware.py
+Description : Project middlewares
+Author      : @tonybnya
+"""
+import time
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metrics, tracing
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip only
+    brotli = None
+
+
+def parse_accept_encoding(header):
+    """
+    Return {coding: q} from an Accept-Encoding header.
+    """
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+class _GzipCompressor:
+    def __init__(self):
+        # wbits=31: zlib stream wrapped in a gzip header
+        self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def process(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    def process(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+COMPRESSORS = {'gzip': _GzipCompressor}
+if brotli is not None:
+    COMPRESSORS = {'br': _BrotliCompressor, **COMPRESSORS}
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with brotli (when installed) or gzip, following the
+    client's Accept-Encoding preferences.
+
+    Responses smaller than COMPRESSION_MIN_SIZE bytes are sent as is.
+    Streaming responses are compressed chunk by chunk and flushed after each
+    chunk, so clients (e.g. event streams) receive data as it is produced.
+
+    Responses that use the CSRF token (admin and session pages with forms)
+    are never compressed: a compressed secret next to reflected input is
+    open to BREACH.
+    """
+
+    def choose_encoding(self, request):
+        accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        wildcard = accepted.get('*', 0)
+        candidates = [(accepted.get(coding, wildcard), coding) for coding in COMPRESSORS]
+        q, coding = max(candidates, key=lambda candidate: candidate[0])
+        return coding if q > 0 else None
+
+    @staticmethod
+    def uses_csrf_token(request, response):
+        # get_token() (and rotate_token()) is the only writer of this key
+        return 'CSRF_COOKIE_NEEDS_UPDATE' in request.META or settings.CSRF_COOKIE_NAME in response.cookies
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or self.uses_csrf_token(request, response):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = self.choose_encoding(request)
+        if coding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.compress_async_stream(response.streaming_content, coding)
+            else:
+                response.streaming_content = self.compress_stream(response.streaming_content, coding)
+            del response.headers['Content-Length']
+        else:
+            compressor = COMPRESSORS[coding]()
+            content = compressor.process(response.content) + compressor.finish()
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = coding
+        return response
+
+    @staticmethod
+    def compress_stream(chunks, coding):
+        compressor = COMPRESSORS[coding]()
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+
+    @staticmethod
+    async def compress_async_stream(chunks, coding):
+        compressor = COMPRESSORS[coding]()
+        async for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+def handler_name(request, view_func):
+    """
+    "ViewSet.action" for viewsets, the class or function name otherwise.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    actions = getattr(view_func, 'actions', None) or {}
+    if view_class is None:
+        return getattr(view_func, '__name__', 'view')
+    if actions:
+        return f"{view_class.__name__}.{actions.get(request.method.lower(), 'method_not_allowed')}"
+    return view_class.__name__
+
+
+class MetricsMiddleware:
+    """
+    Record request counts and latencies per handler (viewset action or view
+    name), and the number and time of the SQL queries each handler runs.
+    Metrics are flushed to METRICS_DIR every METRICS_FLUSH_INTERVAL seconds.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.metrics_handler = 'unmatched'
+        queries = {}
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(QueryRecorder(connection.alias, queries)))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        handler = request.metrics_handler
+        metrics.REQUESTS.inc(handler=handler, method=request.method, status=response.status_code)
+        metrics.REQUEST_DURATION.observe(elapsed, handler=handler, method=request.method)
+        for database, (count, duration) in queries.items():
+            metrics.DB_QUERIES.inc(count, handler=handler, database=database)
+            metrics.DB_QUERY_DURATION.inc(duration, handler=handler, database=database)
+        metrics.registry.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_handler = handler_name(request, view_func)
+
+
+class QueryRecorder:
+    """
+    execute_wrapper adding each query's count and time to `queries[alias]`.
+    """
+
+    def __init__(self, alias, queries):
+        self.alias = alias
+        self.queries = queries
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            count, duration = self.queries.get(self.alias, (0, 0.0))
+            self.queries[self.alias] = (count + 1, duration + time.perf_counter() - started)
+
+
+class TracingMiddleware:
+    """
+    Trace TRACING_SAMPLE_RATE of the requests: a root span per request,
+    renamed after its handler, with a span per SQL query. Unsampled requests
+    only pay for the sampling decision.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with tracing.start_trace(f'{request.method} {request.path}', method=request.method, path=request.path) as root:
+            if root is None:
+                return self.get_response(request)
+            request.trace_root = root
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(tracing.SQLSpans(connection.alias)))
+                response = self.get_response(request)
+            root.attributes['status'] = response.status_code
+            return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        root = getattr(request, 'trace_root', None)
+        if root is not None:
+            root.attributes['handler'] = root.name = handler_name(request, view_func)
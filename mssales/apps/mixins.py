@@ -0,0 +1,209 @@
+"""
+Script Name : mixins.py
+Description : Shared mixins for the API viewsets
+Author      : @tonybnya
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, PermissionDenied, ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .db_routers import use_replica
+from .tracing import span
+
+
+class ReplicaReadMixin:
+    """
+    Serve safe read-only actions from the read replica.
+
+    `replica_actions` maps an action name to the replication lag (in seconds)
+    it tolerates; None uses REPLICA_LAG_TOLERANCE. Other actions, and any
+    unsafe method, stay on the primary.
+    """
+    replica_actions = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        action = getattr(self, 'action_map', {}).get(request.method.lower())
+        if request.method not in SAFE_METHODS or action not in self.replica_actions:
+            return super().dispatch(request, *args, **kwargs)
+
+        with use_replica(lag_tolerance=self.replica_actions[action]):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class TracingMixin:
+    """
+    Add spans for the dispatch of sampled requests, their authentication,
+    permission and throttling checks, get_object and each filter backend
+    (building the queryset; its SQL runs in the "sql" spans).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with span(f'{type(self).__name__}.dispatch'):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        with span(f'{type(self).__name__}.initial', action=self.action):
+            super().initial(request, *args, **kwargs)
+
+    def get_object(self):
+        with span(f'{type(self).__name__}.get_object'):
+            return super().get_object()
+
+    def filter_queryset(self, queryset):
+        for backend in list(self.filter_backends):
+            with span(f'filter.{backend.__name__}'):
+                queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
+
+
+class MultiGetMixin:
+    """
+    Retrieve several objects at once with `?ids=1,2,3` on the list route.
+
+    The objects are served as `retrieve` would (its queryset, filters and
+    serializer) from one query and one pass of its prefetches, up to
+    MULTI_GET_MAX_IDS ids. Object permissions are checked on each object;
+    ids that do not exist or are not allowed are reported in `not_found`
+    and `forbidden` instead of failing the request.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if 'ids' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        return self.multi_get(request)
+
+    def parse_ids(self, model):
+        field = model._meta.pk if self.lookup_field == 'pk' else model._meta.get_field(self.lookup_field)
+        values = [value.strip() for value in self.request.query_params['ids'].split(',')]
+        try:
+            ids = [field.to_python(value) for value in values if value]
+        except DjangoValidationError as e:
+            raise ValidationError({'ids': e.messages})
+        # keep the requested order, once per id
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            raise ValidationError({'ids': 'List at least one id.'})
+        if len(ids) > settings.MULTI_GET_MAX_IDS:
+            raise ValidationError({'ids': f'List at most {settings.MULTI_GET_MAX_IDS} ids.'})
+        return ids
+
+    def multi_get(self, request):
+        self.action = 'retrieve'
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = self.parse_ids(queryset.model)
+        with span(f'{type(self).__name__}.multi_get', ids=len(ids)):
+            found = {
+                getattr(obj, self.lookup_field): obj
+                for obj in queryset.filter(**{f'{self.lookup_field}__in': ids})
+            }
+
+        objects, not_found, forbidden = [], [], []
+        for pk in ids:
+            obj = found.get(pk)
+            if obj is None:
+                not_found.append(pk)
+                continue
+            try:
+                self.check_object_permissions(request, obj)
+            except (NotAuthenticated, PermissionDenied):
+                forbidden.append(pk)
+                continue
+            objects.append(obj)
+
+        serializer = self.get_serializer(objects, many=True)
+        return Response({'results': serializer.data, 'not_found': not_found, 'forbidden': forbidden})
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is still in progress, retry later.'
+    default_code = 'idempotency_conflict'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'This Idempotency-Key was already used for a different request.'
+    default_code = 'idempotency_key_reused'
+
+
+class IdempotentReplay(Exception):
+    """
+    Raised to answer with the stored response of a completed request.
+    """
+
+    def __init__(self, stored):
+        self.stored = stored
+
+
+class IdempotencyMixin:
+    """
+    Honour the Idempotency-Key header on `idempotent_actions`.
+
+    The first request with a key (per user, action and object) runs and its
+    response, unless 5xx, is kept in the cache for IDEMPOTENCY_TTL seconds:
+    retries get it back without running again. A duplicate arriving while
+    the first one runs waits for its response, up to
+    IDEMPOTENCY_WAIT_TIMEOUT seconds. Reusing a key with another body is
+    refused.
+    """
+    idempotent_actions = set()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._idempotency_key = None
+        key = request.META.get('HTTP_IDEMPOTENCY_KEY')
+        if key is None or self.action not in self.idempotent_actions:
+            return
+        if not key or len(key) > 255:
+            raise ValidationError({'Idempotency-Key': 'Must be 1 to 255 characters long.'})
+
+        scope = f"{request.user.pk}:{self.basename}:{self.action}:{kwargs.get(self.lookup_field, '')}:{key}"
+        cache_key = 'idempotency:' + hashlib.sha256(scope.encode()).hexdigest()
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        delay = 0.02
+        while True:
+            stored = cache.get(cache_key)
+            if stored is not None:
+                if stored['fingerprint'] != fingerprint:
+                    raise IdempotencyKeyReused()
+                raise IdempotentReplay(stored)
+            # the first request takes the lock; it expires if its worker dies
+            if cache.add(f'{cache_key}:lock', fingerprint, settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                self._idempotency_key = (cache_key, fingerprint)
+                return
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict()
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, IdempotentReplay):
+            stored = exc.stored
+            response = Response(stored['data'], status=stored['status'], headers=stored['headers'])
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        idempotency_key = getattr(self, '_idempotency_key', None)
+        if idempotency_key is not None:
+            self._idempotency_key = None
+            cache_key, fingerprint = idempotency_key
+            if response.status_code < 500:
+                cache.set(cache_key, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                    'headers': {name: response[name] for name in ['Location'] if response.has_header(name)},
+                }, settings.IDEMPOTENCY_TTL)
+            cache.delete(f'{cache_key}:lock')
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,14 @@
+"""
+Script Name : apps.py
+Description : Products app configuration
+Author      : @tonybnya
+"""
+from django.apps import AppConfig
+
+
+class ProductsConfig(AppConfig):
+    name = 'apps.products'
+    label = 'products'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,107 @@
+"""
+Script Name : cache.py
+Description : Per-process LRU cache for scanner lookups by barcode or internal reference
+Author      : @tonybnya
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from apps.metrics import CACHE_REQUESTS
+from django.conf import settings
+from django.db import transaction
+
+LOOKUP_FIELDS = ('barcode', 'internal_reference')
+LOOKUP_VALUES = ('id', 'name', 'internal_reference', 'barcode', 'sales_price')
+
+
+class ProductLookupCache:
+    """
+    LRU map (field, value) -> product values, kept in process memory.
+
+    Entries are dropped when the product is saved or deleted in this process
+    and expire after PRODUCT_LOOKUP_CACHE_TTL seconds, which bounds how long
+    other processes may serve a changed product.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (field, value) -> (expires_at, product values)
+        self._entries = OrderedDict()
+        # product id -> keys cached for it
+        self._keys = {}
+
+    def get(self, field, value):
+        key = (field, value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, field, value, product):
+        key = (field, value)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + settings.PRODUCT_LOOKUP_CACHE_TTL, product)
+            self._keys.setdefault(product['id'], set()).add(key)
+            while len(self._entries) > settings.PRODUCT_LOOKUP_CACHE_SIZE:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, product_id):
+        with self._lock:
+            for key in self._keys.pop(product_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys.get(entry[1]['id'])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys[entry[1]['id']]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+product_lookups = ProductLookupCache()
+
+
+def lookup_product(field, value):
+    """
+    Return the LOOKUP_VALUES of the product whose `field` equals `value`
+    (lowest id if several match), or None.
+    """
+    product = product_lookups.get(field, value)
+    CACHE_REQUESTS.inc(cache='product_lookup', result='miss' if product is None else 'hit')
+    if product is None:
+        from .models import Product
+        product = Product.objects.filter(**{field: value}).order_by('id').values(*LOOKUP_VALUES).first()
+        if product is not None:
+            product_lookups.set(field, value, product)
+    return product
+
+
+def invalidate_products(product_ids):
+    """
+    Drop the cached lookups of `product_ids` once the current transaction
+    commits (at once outside a transaction).
+    """
+    def invalidate():
+        for product_id in product_ids:
+            product_lookups.invalidate(product_id)
+
+    invalidate()
+    # again after commit, so a lookup racing the write cannot keep the old row
+    transaction.on_commit(invalidate)
@@ -0,0 +1,25 @@
+"""
+Script Name : filters.py
+Description : Filters for the Products app
+Author      : @tonybnya
+"""
+import django_filters
+
+from .models import Product, ProductCategory
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    Product filters; `category_tree` matches a category and all its subcategories.
+    """
+    category_tree = django_filters.NumberFilter(method='filter_category_tree', label='Category and subcategories')
+
+    class Meta:
+        model = Product
+        fields = ['product_type', 'favorite', 'responsible', 'category']
+
+    def filter_category_tree(self, queryset, name, value):
+        path = ProductCategory.objects.filter(pk=value).values_list('path', flat=True).first()
+        if path is None:
+            return queryset.none()
+        return queryset.filter(category__path__startswith=path)
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='product',
+            name='activity_exception_decoration',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='activity',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='decoration',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='exception',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(check=models.Q(('quantity_on_hand__gte', 0)), name='products_quantity_on_hand_non_negative'),
+        ),
+    ]
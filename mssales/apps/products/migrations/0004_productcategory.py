@@ -0,0 +1,71 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def parse_categories(apps, schema_editor):
+    """
+    Build the category tree from the product_category strings
+    ("All / Saleable / Office Furniture") and link every product to its node.
+    """
+    Product = apps.get_model('products', 'Product')
+    ProductCategory = apps.get_model('products', 'ProductCategory')
+
+    nodes = {}  # tuple of names -> category
+    for full_name in Product.objects.order_by().values_list('product_category', flat=True).distinct():
+        names = tuple(part.strip() for part in (full_name or '').split('/') if part.strip())
+        for depth in range(1, len(names) + 1):
+            key = names[:depth]
+            if key in nodes:
+                continue
+            parent = nodes.get(key[:-1])
+            category = ProductCategory.objects.create(
+                name=key[-1],
+                parent=parent,
+                full_name=' / '.join(key),
+                depth=depth - 1
+            )
+            category.path = f'{parent.path if parent else ""}{category.pk}/'
+            category.save(update_fields=['path'])
+            nodes[key] = category
+        if names:
+            Product.objects.filter(product_category=full_name).update(
+                category=nodes[names],
+                product_category=nodes[names].full_name
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_barcode_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('path', models.CharField(db_index=True, editable=False, max_length=255)),
+                ('full_name', models.CharField(editable=False, max_length=255)),
+                ('depth', models.PositiveSmallIntegerField(default=0, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='products.productcategory')),
+            ],
+            options={
+                'verbose_name_plural': 'product categories',
+                'db_table': 'product_categories',
+                'ordering': ['full_name'],
+                'unique_together': {('parent', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='products', to='products.productcategory'),
+        ),
+        migrations.RunPython(parse_categories, migrations.RunPython.noop),
+    ]
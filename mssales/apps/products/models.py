@@ -4,7 +4,111 @@ Description : Product Model
 Author      : @tonybnya
 """
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Concat, Substr
+from django.utils import timezone
+
+CATEGORY_SEPARATOR = ' / '
+
+
+class ProductCategoryQuerySet(models.QuerySet):
+    def subtree(self, category):
+        """
+        `category` and all its descendants, with one indexed prefix match on path.
+        """
+        return self.filter(path__startswith=category.path)
+
+    def get_or_create_from_full_name(self, full_name):
+        """
+        Return the category named like "All / Saleable / Office Furniture",
+        creating the missing levels.
+        """
+        category = None
+        for name in [part.strip() for part in full_name.split('/') if part.strip()]:
+            category, _ = self.get_or_create(parent=category, name=name)
+        return category
+
+
+class ProductCategory(models.Model):
+    """
+    Modelisation of a ProductCategory.
+    Tree stored as a materialized path of ids ("1/4/9/"), so a subtree is a
+    prefix match on `path`.
+    """
+    name = models.CharField(max_length=255)
+    parent = models.ForeignKey('self', on_delete=models.PROTECT, blank=True, null=True, related_name='children')
+
+    path = models.CharField(max_length=255, editable=False, db_index=True)
+    full_name = models.CharField(max_length=255, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductCategoryQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'product_categories'
+        ordering = ['full_name']
+        unique_together = ['parent', 'name']
+        verbose_name_plural = 'product categories'
+
+    def __str__(self):
+        return self.full_name
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self.pk is None:
+                # the path ends with our own id
+                super().save(*args, **kwargs)
+                kwargs.pop('force_insert', None)
+
+            old = ProductCategory.objects.filter(pk=self.pk).values('path', 'full_name', 'depth').first()
+            if self.parent:
+                if self.parent.path.startswith(old['path'] or f'{self.pk}/'):
+                    raise ValueError("A category cannot be moved under its own subtree")
+                self.path = f'{self.parent.path}{self.pk}/'
+                self.full_name = f'{self.parent.full_name}{CATEGORY_SEPARATOR}{self.name}'
+                self.depth = self.parent.depth + 1
+            else:
+                self.path = f'{self.pk}/'
+                self.full_name = self.name
+                self.depth = 0
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'path', 'full_name', 'depth'}
+            super().save(*args, **kwargs)
+
+            if old['path'] and (old['path'], old['full_name']) != (self.path, self.full_name):
+                self._rewrite_descendants(old)
+
+    def _rewrite_descendants(self, old):
+        """
+        Move the paths and names of the descendants along with this category.
+        """
+        descendants = ProductCategory.objects.filter(path__startswith=old['path']).exclude(pk=self.pk)
+        descendants.update(
+            path=Concat(models.Value(self.path), Substr('path', len(old['path']) + 1)),
+            full_name=Concat(models.Value(self.full_name), Substr('full_name', len(old['full_name']) + 1)),
+            depth=models.F('depth') + (self.depth - old['depth'])
+        )
+        Product.objects.filter(category__path__startswith=self.path).update(
+            product_category=Concat(
+                models.Value(self.full_name), Substr('product_category', len(old['full_name']) + 1)
+            )
+        )
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_reserved(self, at=None):
+        """
+        Annotate each product with `reserved_qty`, the quantity held by its
+        active reservations, computed in the same grouped query.
+        """
+        active = models.Q(reservations__expires_at__isnull=True) | models.Q(
+            reservations__expires_at__gt=at or timezone.now()
+        )
+        return self.annotate(reserved_qty=Coalesce(models.Sum('reservations__qty', filter=active), 0))
 
 
 class Product(models.Model):
@@ -25,9 +129,13 @@ class Product(models.Model):
 
     name = models.CharField(max_length=255)
     internal_reference = models.CharField(max_length=100, unique=True)
-    barcode = models.CharField(max_length=100, blank=True, null=True)
+    barcode = models.CharField(max_length=100, blank=True, null=True, db_index=True)
 
+    # display name of `category`, kept for API compatibility
     product_category = models.CharField(max_length=255, default="All / Saleable / Office Furniture")
+    category = models.ForeignKey(
+        ProductCategory, on_delete=models.PROTECT, blank=True, null=True, related_name='products'
+    )
     product_type = models.CharField(max_length=50, choices=PRODUCT_TYPE_CHOICES, default='storable_product')
     favorite = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default="normal")
 
@@ -38,6 +146,8 @@ class Product(models.Model):
 
     quantity_on_hand = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     forecasted_quantity = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    # bumped on every write, used for optimistic concurrency checks
+    version = models.PositiveIntegerField(default=0, editable=False)
 
     activity = models.CharField(max_length=255, blank=True, null=True)
     exception = models.CharField(max_length=255, blank=True, null=True)
@@ -47,20 +157,37 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         db_table = 'products'
         ordering = ['name']
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(quantity_on_hand__gte=0),
+                name='products_quantity_on_hand_non_negative'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name} ({self.internal_reference})'
 
     @property
-    def available_quantity(self):
+    def reserved_quantity(self):
         """
-        Calculate available quantity (on_hand - reserved)
+        Calculate reserved quantity (active reservations).
+        Uses the `reserved_qty` annotation of with_reserved() when present.
         """
+        if 'reserved_qty' in self.__dict__:
+            return self.reserved_qty
         from apps.inventory.models import Reservation
-        reserved = Reservation.objects.filter(product=self).aggregate(
+        return Reservation.objects.active().filter(product=self).aggregate(
             total_reserved=models.Sum('qty')
         )['total_reserved'] or 0
-        return self.quantity_on_hand - reserved
+
+    @property
+    def available_quantity(self):
+        """
+        Calculate available quantity (on_hand - reserved)
+        """
+        return self.quantity_on_hand - self.reserved_quantity
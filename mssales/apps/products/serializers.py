@@ -4,26 +4,36 @@ Description : Serializers for the Products app
 Author      : @tonybnya
 """
 
+from apps.inventory.ledger import record_moves
+from apps.inventory.stock import StaleVersion
+from apps.tracing import TracedSerializerMixin
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Product
+from .cache import invalidate_products
+from .models import Product, ProductCategory
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the Product model.
     """
     available_quantity = serializers.ReadOnlyField()
+    # on input: the version the client last read, checked on update
+    version = serializers.IntegerField(required=False, min_value=0)
 
     class Meta:
         model = Product
         fields = [
-            'id', 'name', 'internal_reference', 'barcode', 'product_category',
+            'id', 'name', 'internal_reference', 'barcode', 'product_category', 'category',
             'product_type', 'favorite', 'responsible', 'sales_price', 'cost',
             'quantity_on_hand', 'forecasted_quantity', 'available_quantity',
-            'activity', 'exception', 'decoration', 'created_at', 'updated_at'
+            'activity', 'exception', 'decoration', 'version', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'available_quantity']
+        # forecasted_quantity is derived from the stock ledger and reservations
+        read_only_fields = ['id', 'forecasted_quantity', 'created_at', 'updated_at', 'available_quantity']
 
     def validate_sales_price(self, value):
         if value < 0:
@@ -44,6 +54,84 @@ class ProductSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Internal reference must be unique.")
         return value
 
+    def _resolve_category(self, validated_data):
+        """
+        Keep `category` and the `product_category` display name in step,
+        creating the categories named by a new product_category string.
+        """
+        if validated_data.get('category') is not None:
+            validated_data['product_category'] = validated_data['category'].full_name
+        elif validated_data.get('product_category'):
+            category = ProductCategory.objects.get_or_create_from_full_name(validated_data['product_category'])
+            if category is not None:
+                validated_data['category'] = category
+                validated_data['product_category'] = category.full_name
+
+    def create(self, validated_data):
+        validated_data.pop('version', None)
+        validated_data.setdefault('product_category', Product._meta.get_field('product_category').default)
+        validated_data['forecasted_quantity'] = validated_data.get('quantity_on_hand', 0)
+        with transaction.atomic():
+            self._resolve_category(validated_data)
+            product = super().create(validated_data)
+            if product.quantity_on_hand:
+                record_moves([{'product': product.pk, 'kind': 'receive', 'on_hand_delta': product.quantity_on_hand}])
+        return product
+
+    def update(self, instance, validated_data):
+        """
+        Version-checked update: the row is written only if nobody changed it
+        since the client (or this request) read it.
+        """
+        expected_version = validated_data.pop('version', instance.version)
+        if expected_version != instance.version:
+            raise StaleVersion("Product was modified concurrently, reload it and retry.")
+
+        # the version check below guarantees the row still holds instance's stock
+        delta = validated_data.get('quantity_on_hand', instance.quantity_on_hand) - instance.quantity_on_hand
+
+        with transaction.atomic():
+            self._resolve_category(validated_data)
+            updated = Product.objects.filter(pk=instance.pk, version=expected_version).update(
+                **validated_data,
+                forecasted_quantity=F('forecasted_quantity') + delta,
+                version=F('version') + 1,
+                updated_at=timezone.now()
+            )
+            if not updated:
+                raise StaleVersion("Product was modified concurrently, reload it and retry.")
+            if delta:
+                record_moves([{'product': instance.pk, 'kind': 'adjust', 'on_hand_delta': delta}])
+            # queryset updates send no post_save
+            invalidate_products([instance.pk])
+
+        instance.refresh_from_db()
+        return instance
+
+
+class ProductCategorySerializer(TracedSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer for the ProductCategory model.
+    """
+    # no parent: a root category
+    parent = serializers.PrimaryKeyRelatedField(queryset=ProductCategory.objects.all(), allow_null=True, default=None)
+
+    class Meta:
+        model = ProductCategory
+        fields = ['id', 'name', 'parent', 'full_name', 'path', 'depth', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'full_name', 'path', 'depth', 'created_at', 'updated_at']
+
+    def validate_name(self, value):
+        if '/' in value:
+            raise serializers.ValidationError("Category names cannot contain '/'.")
+        return value.strip()
+
+    def validate(self, data):
+        parent = data.get('parent', self.instance.parent if self.instance else None)
+        if self.instance and parent and parent.path.startswith(self.instance.path):
+            raise serializers.ValidationError("A category cannot be moved under its own subtree.")
+        return data
+
 
 class ProductSummarySerializer(serializers.ModelSerializer):
     """
@@ -54,3 +142,26 @@ class ProductSummarySerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ['id', 'name', 'internal_reference', 'sales_price', 'available_quantity']
+
+
+class AvailabilityLookupSerializer(serializers.Serializer):
+    """
+    Products to look up, by exactly one of ids, internal references or barcodes.
+    """
+    MAX_ITEMS = 5000
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=MAX_ITEMS)
+    internal_references = serializers.ListField(
+        child=serializers.CharField(max_length=100), required=False, max_length=MAX_ITEMS
+    )
+    barcodes = serializers.ListField(child=serializers.CharField(max_length=100), required=False, max_length=MAX_ITEMS)
+
+    LOOKUP_FIELDS = {'ids': 'id', 'internal_references': 'internal_reference', 'barcodes': 'barcode'}
+
+    def validate(self, data):
+        keys = [key for key in self.LOOKUP_FIELDS if data.get(key)]
+        if len(keys) != 1:
+            raise serializers.ValidationError("Provide exactly one of ids, internal_references or barcodes.")
+        data['field'] = self.LOOKUP_FIELDS[keys[0]]
+        data['values'] = list(dict.fromkeys(data[keys[0]]))
+        return data
@@ -0,0 +1,18 @@
+"""
+Script Name : signals.py
+Description : Signal handlers of the Products app
+Author      : @tonybnya
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_products
+from .models import Product
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_lookups(sender, instance, **kwargs):
+    """
+    Drop the scanner lookups of a saved or deleted product.
+    """
+    invalidate_products([instance.pk])
@@ -0,0 +1,42 @@
+"""
+Script Name : tests.py
+Description : Tests of the products app
+Author      : @tonybnya
+"""
+from apps.customers.models import Customer
+from apps.inventory.models import Reservation
+from apps.sales.models import SalesOrder
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from .models import Product
+
+
+class ProductMultiGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='multi-get', password='multi-get')
+        customer = Customer.objects.create(name='Multi get', email='multi-get@example.com', phone='+15550000002')
+        order = SalesOrder.objects.create(customer=customer)
+        cls.products = [
+            Product.objects.create(
+                name=f'Multi get {i}', internal_reference=f'MG-{i}', sales_price=10, cost=5, quantity_on_hand=10
+            )
+            for i in range(5)
+        ]
+        Reservation.objects.bulk_create([Reservation(order=order, product=product, qty=2) for product in cls.products])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def multi_get(self, products):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/products/', {'ids': ','.join(str(p.id) for p in products)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['available_quantity'] for row in response.data['results']], [8] * len(products))
+        return len(queries)
+
+    def test_multi_get_query_count_is_constant(self):
+        self.assertEqual(self.multi_get(self.products[:1]), self.multi_get(self.products))
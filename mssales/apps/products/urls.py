@@ -6,10 +6,11 @@ Author      : @tonybnya
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import ProductViewSet
+from .views import ProductCategoryViewSet, ProductViewSet
 
 router = DefaultRouter()
 router.register(r'products', ProductViewSet)
+router.register(r'product-categories', ProductCategoryViewSet)
 
 urlpatterns = [
     path('', include(router.urls))
@@ -3,17 +3,36 @@ Script Name : views.py
 Description : Views of the Product Model
 Author      : @tonybnya
 """
+from apps.inventory.ledger import stock_at
+from apps.inventory.serializers import StockMovementBatchItemSerializer, StockMovementSerializer
+from apps.inventory.stock import StaleVersion, apply_movement, apply_movements
+from apps.mixins import MultiGetMixin, ReplicaReadMixin, TracingMixin
+from apps.sales.models import SalesOrderLine
+from apps.sales.pricing import line_total_expression
+from django.db import models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, viewsets
+from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .models import Product
-from .serializers import ProductSerializer, ProductSummarySerializer
+from .cache import LOOKUP_FIELDS, lookup_product
+from .filters import ProductFilter
+from .models import Product, ProductCategory
+from .serializers import (AvailabilityLookupSerializer, ProductCategorySerializer, ProductSerializer,
+                          ProductSummarySerializer)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class VersionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Product was modified concurrently, reload it and retry.'
+    default_code = 'version_conflict'
+
+
+class ProductViewSet(TracingMixin, MultiGetMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     Product View.
     """
@@ -21,16 +40,31 @@ class ProductViewSet(viewsets.ModelViewSet):
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['product_type', 'favorite', 'responsible']
+    filterset_class = ProductFilter
     search_fields = ['name', 'internal_reference', 'barcode', 'product_category']
     ordering_fields = ['name', 'sales_price', 'cost', 'quantity_on_hand', 'created_at']
     ordering = ['name']
+    replica_actions = {'list': None, 'summary': None, 'low_stock': 30, 'batch_availability': None, 'lookup': None}
+    throttle_costs = {'summary': 5, 'low_stock': 30, 'batch_availability': 5}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve', 'summary', 'low_stock'):
+            # available_quantity reads the reserved quantity annotated in the same query
+            queryset = queryset.with_reserved()
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'summary':
             return ProductSummarySerializer
         return ProductSerializer
 
+    def perform_update(self, serializer):
+        try:
+            serializer.save()
+        except StaleVersion as e:
+            raise VersionConflict(str(e))
+
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """
@@ -59,12 +93,244 @@ class ProductViewSet(viewsets.ModelViewSet):
         Get detailed availability infos for a product.
         """
         product = self.get_object()
+        reserved = product.reserved_quantity
         data = {
             'product_id': product.id,
             'product_name': product.name,
             'quantity_on_hand': product.quantity_on_hand,
-            'available_quantity': product.available_quantity,
-            'reserved_quantity': product.quantity_on_hand - product.available_quantity,
+            'available_quantity': product.quantity_on_hand - reserved,
+            'reserved_quantity': reserved,
             'forecasted_quantity': product.forecasted_quantity
         }
         return Response(data)
+
+    @action(detail=False, methods=['get', 'post'], url_path='batch-availability')
+    def batch_availability(self, request):
+        """
+        Get availability of many products at once, by ids, internal_references
+        or barcodes (POST body, or comma-separated query params for GET).
+        Rows follow the order of `fields`.
+        """
+        if request.method == 'GET':
+            data = {
+                key: request.query_params[key].split(',')
+                for key in AvailabilityLookupSerializer.LOOKUP_FIELDS if request.query_params.get(key)
+            }
+        else:
+            data = request.data
+        serializer = AvailabilityLookupSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        field, values = serializer.validated_data['field'], serializer.validated_data['values']
+
+        products = Product.objects.filter(**{f'{field}__in': values}).with_reserved().order_by().values_list(
+            field, 'id', 'internal_reference', 'barcode', 'quantity_on_hand', 'reserved_qty', 'forecasted_quantity'
+        )
+        rows, found = [], set()
+        for key, pk, reference, barcode, on_hand, reserved, forecasted in products:
+            rows.append([pk, reference, barcode, on_hand, reserved, on_hand - reserved, forecasted])
+            found.add(key)
+        return Response({
+            'fields': ['id', 'internal_reference', 'barcode', 'on_hand', 'reserved', 'available', 'forecasted'],
+            'rows': rows,
+            'not_found': [value for value in values if value not in found]
+        })
+
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        """
+        Resolve a scanned code by exact match: ?barcode=... or ?internal_reference=...
+        """
+        fields = [field for field in LOOKUP_FIELDS if request.query_params.get(field)]
+        if len(fields) != 1:
+            return Response(
+                {'error': 'Provide exactly one of barcode or internal_reference.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        product = lookup_product(fields[0], request.query_params[fields[0]])
+        if product is None:
+            return Response({'error': 'Product not found.'}, status=status.HTTP_404_NOT_FOUND)
+        # decimals as strings, like ProductSerializer
+        return Response({**product, 'sales_price': str(product['sales_price'])})
+
+    @action(detail=True, methods=['get'], url_path='stock-at')
+    def stock_at(self, request, pk=None):
+        """
+        Get on-hand/reserved/available stock at a point in time (?at=ISO datetime).
+        """
+        product = self.get_object()
+        at = request.query_params.get('at')
+        if at:
+            at = parse_datetime(at)
+            if at is None:
+                return Response({'error': 'Invalid datetime for "at".'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        level = stock_at([product.id], at)[product.id]
+        return Response({
+            'product_id': product.id,
+            'at': at or timezone.now(),
+            'quantity_on_hand': level['on_hand'],
+            'reserved_quantity': level['reserved'],
+            'available_quantity': level['available']
+        })
+
+    @action(detail=True, methods=['post'])
+    def receive(self, request, pk=None):
+        """
+        Receive stock: quantity_on_hand += qty.
+        """
+        return self._move_stock(request, pk, 'receive')
+
+    @action(detail=True, methods=['post'])
+    def adjust(self, request, pk=None):
+        """
+        Adjust stock by a signed qty (inventory count corrections).
+        """
+        return self._move_stock(request, pk, 'adjust')
+
+    @action(detail=True, methods=['post'])
+    def ship(self, request, pk=None):
+        """
+        Ship stock: quantity_on_hand -= qty, refused if stock would go negative.
+        """
+        return self._move_stock(request, pk, 'ship')
+
+    @action(detail=False, methods=['post'], url_path='stock-movements')
+    def stock_movements(self, request):
+        """
+        Apply a batch of movements ({product, kind, qty}) all-or-nothing.
+        """
+        serializer = StockMovementBatchItemSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            deltas = apply_movements(serializer.validated_data)
+        except Product.DoesNotExist as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'message': 'Stock movements applied successfully',
+            'products_updated': len(deltas)
+        })
+
+    def _move_stock(self, request, pk, kind):
+        """
+        Apply one stock movement with a conditional UPDATE, without loading
+        the product first.
+        """
+        serializer = StockMovementSerializer(data=request.data, context={'kind': kind})
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            apply_movement(
+                pk, kind, serializer.validated_data['qty'],
+                expected_version=serializer.validated_data.get('version')
+            )
+        except Product.DoesNotExist as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except StaleVersion as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        product = Product.objects.filter(pk=pk).values('id', 'quantity_on_hand', 'version').get()
+        return Response({
+            'product_id': product['id'],
+            'quantity_on_hand': product['quantity_on_hand'],
+            'version': product['version']
+        })
+
+
+class ProductCategoryViewSet(TracingMixin, ReplicaReadMixin, viewsets.ModelViewSet):
+    """
+    Product Category View.
+    """
+    queryset = ProductCategory.objects.all()
+    serializer_class = ProductCategorySerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['parent', 'depth']
+    search_fields = ['name', 'full_name']
+    ordering_fields = ['full_name', 'name', 'depth']
+    ordering = ['full_name']
+    replica_actions = {'list': None, 'rollup': 30}
+    throttle_costs = {'rollup': 10}
+
+    def destroy(self, request, *args, **kwargs):
+        try:
+            return super().destroy(request, *args, **kwargs)
+        except models.ProtectedError:
+            return Response(
+                {'error': 'Category still has subcategories or products.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    @action(detail=False, methods=['get'])
+    def rollup(self, request):
+        """
+        Get stock and sales totals of each category including its subcategories
+        (?root=<id> to restrict to one subtree).
+        """
+        categories = self.get_queryset()
+        root = request.query_params.get('root') or None
+        if root is not None:
+            try:
+                root = int(root)
+            except ValueError:
+                return Response({'error': 'root must be a category id.'}, status=status.HTTP_400_BAD_REQUEST)
+            root = ProductCategory.objects.filter(pk=root).first()
+            if root is None:
+                return Response({'error': 'Category not found.'}, status=status.HTTP_404_NOT_FOUND)
+            categories = categories.subtree(root)
+
+        totals = {
+            category['id']: {
+                **category,
+                'products': 0,
+                'quantity_on_hand': 0,
+                'stock_value': 0,
+                'quantity_sold': 0,
+                'revenue': 0
+            }
+            for category in categories.values('id', 'full_name', 'path', 'depth')
+        }
+        products = Product.objects.filter(category__isnull=False)
+        lines = SalesOrderLine.objects.filter(order__status='confirmed', product__category__isnull=False)
+        if root is not None:
+            products = products.filter(category__path__startswith=root.path)
+            lines = lines.filter(product__category__path__startswith=root.path)
+
+        stock = products.order_by().values('category').annotate(
+            product_count=models.Count('id'),
+            on_hand=models.Sum('quantity_on_hand'),
+            value=models.Sum(
+                models.F('quantity_on_hand') * models.F('cost'),
+                output_field=models.DecimalField(max_digits=20, decimal_places=2)
+            )
+        ).values_list('category', 'product_count', 'on_hand', 'value')
+        sales = lines.order_by().values('product__category').annotate(
+            sold=models.Sum('qty'),
+            amount=models.Sum(line_total_expression())
+        ).values_list('product__category', 'sold', 'amount')
+
+        # add each category's own figures to itself and its ancestors
+        for category_id, *values in stock:
+            for ancestor_id in self._ancestors(totals, category_id):
+                for key, value in zip(['products', 'quantity_on_hand', 'stock_value'], values):
+                    totals[ancestor_id][key] += value or 0
+        for category_id, *values in sales:
+            for ancestor_id in self._ancestors(totals, category_id):
+                for key, value in zip(['quantity_sold', 'revenue'], values):
+                    totals[ancestor_id][key] += value or 0
+
+        for category in totals.values():
+            del category['path']
+        return Response(list(totals.values()))
+
+    @staticmethod
+    def _ancestors(totals, category_id):
+        return [int(pk) for pk in totals[category_id]['path'].split('/')[:-1] if int(pk) in totals]
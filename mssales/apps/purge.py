@@ -0,0 +1,127 @@
+"""
+Script Name : purge.py
+Description : Chunked bulk deletion of customers and products without Django's cascade collector
+Author      : @tonybnya
+"""
+from apps.customers.models import Customer
+from apps.inventory.ledger import record_reservation_rows
+from apps.inventory.models import Reservation, StockMove, StockSnapshot
+from apps.products.cache import invalidate_products
+from apps.products.models import Product
+from apps.sales.models import ArchivedSalesOrder, ArchivedSalesOrderLine, SalesOrder, SalesOrderLine
+from django.db import connections, transaction
+from django.db.models import Sum
+
+# rows deleted per statement (and per transaction)
+BATCH_SIZE = 1000
+
+
+def delete_rows(queryset):
+    """
+    DELETE the rows of `queryset` by primary key, with plain SQL: no
+    instances are loaded, no cascade is followed and no signal is sent, so
+    the children must already be gone. Return the number of rows deleted.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    ids = list(queryset.order_by().values_list('pk', flat=True))
+    deleted = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), BATCH_SIZE):
+            chunk = ids[start:start + BATCH_SIZE]
+            cursor.execute(f"DELETE FROM {table} WHERE {pk} IN ({', '.join(['%s'] * len(chunk))})", chunk)
+            deleted += cursor.rowcount
+    return deleted
+
+
+def delete_in_batches(queryset, batch_size=BATCH_SIZE, progress=None, label=None):
+    """
+    Delete the rows of `queryset` by primary key, `batch_size` rows per
+    transaction. Return the number of rows deleted.
+    """
+    model = queryset.model
+    label = label or model._meta.db_table
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += delete_rows(model._base_manager.filter(pk__in=ids))
+        if progress:
+            progress(label, deleted)
+    return deleted
+
+
+def purge_customers(customer_ids, batch_size=BATCH_SIZE, progress=None):
+    """
+    Delete customers with their sales orders, lines and reservations (and
+    archived orders), child-first in bounded batches.
+
+    Reservations are released through the ledger, so forecasted_quantity of
+    the reserved products stays consistent; stock moves keep their history
+    with a NULL order, as with on_delete=SET_NULL. `progress(label, count)`
+    is called after each batch. Return {table: rows deleted}.
+    """
+    customer_ids = list(customer_ids)
+    counts = {'reservations': 0, 'sales_order_lines': 0, 'sales_orders': 0}
+    orders = SalesOrder.objects.filter(customer_id__in=customer_ids)
+
+    while True:
+        with transaction.atomic():
+            order_ids = list(orders.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not order_ids:
+                break
+
+            reservations = Reservation.objects.filter(order_id__in=order_ids)
+            released = list(
+                reservations.order_by().values('product_id').annotate(total=Sum('qty')).values_list('product_id', 'total')
+            )
+            counts['reservations'] += delete_rows(reservations)
+            # one release move per product and batch; it outlives the orders so references none
+            record_reservation_rows([(None, product_id, qty) for product_id, qty in released], release=True)
+
+            StockMove.objects.filter(order_id__in=order_ids).update(order=None)
+            counts['sales_order_lines'] += delete_rows(SalesOrderLine.objects.filter(order_id__in=order_ids))
+            counts['sales_orders'] += delete_rows(SalesOrder.objects.filter(pk__in=order_ids))
+        if progress:
+            progress('sales_orders', counts['sales_orders'])
+
+    counts.update(delete_archived_orders(customer_ids, batch_size, progress))
+    counts['customers'] = delete_in_batches(Customer.objects.filter(pk__in=customer_ids), batch_size, progress)
+    return counts
+
+
+def delete_archived_orders(customer_ids, batch_size=BATCH_SIZE, progress=None):
+    """
+    Delete the archived orders (and their lines) of customers. The archive
+    has no foreign key constraint, so nothing else removes them.
+    Return {table: rows deleted}.
+    """
+    archived = ArchivedSalesOrder.objects.filter(customer_id__in=customer_ids)
+    return {
+        'sales_order_lines_archive': delete_in_batches(
+            ArchivedSalesOrderLine.objects.filter(order__in=archived.values('pk')), batch_size, progress
+        ),
+        'sales_orders_archive': delete_in_batches(archived, batch_size, progress),
+    }
+
+
+def purge_products(product_ids, batch_size=BATCH_SIZE, progress=None):
+    """
+    Delete products with their reservations, order lines, stock moves and
+    snapshots, child-first in bounded batches. Archived order lines keep
+    their product id as history. Return {table: rows deleted}.
+    """
+    product_ids = list(product_ids)
+    counts = {}
+    for model in [Reservation, SalesOrderLine, StockSnapshot, StockMove]:
+        counts[model._meta.db_table] = delete_in_batches(
+            model.objects.filter(product_id__in=product_ids), batch_size, progress
+        )
+    counts['products'] = delete_in_batches(Product.objects.filter(pk__in=product_ids), batch_size, progress)
+    # no post_delete signal was sent for them
+    invalidate_products(product_ids)
+    return counts
@@ -0,0 +1,274 @@
+"""
+Script Name : query_plans.py
+Description : EXPLAIN snapshots of the critical querysets and plan regression checks
+Author      : @tonybnya
+"""
+import json
+import os
+import random
+import re
+from datetime import timedelta
+
+from apps.customers.models import Customer
+from apps.customers.views import CustomerViewSet
+from apps.inventory.models import Reservation
+from apps.inventory.views import ReservationViewSet
+from apps.products.models import Product
+from apps.products.views import ProductViewSet
+from apps.sales.models import SalesOrder, SalesOrderLine
+from apps.sales.views import SalesOrderLineViewSet, SalesOrderViewSet
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+# longest SQL statement kept in a snapshot
+SQL_MAX_LENGTH = 300
+
+
+def view_query(viewset, action, params=None):
+    """
+    Evaluate the first page of `action` the way the viewset builds it:
+    get_queryset() through its filter backends, with `params` as query string.
+    """
+    def run():
+        view = viewset(action=action, action_map={'get': action}, args=(), kwargs={}, format_kwarg=None)
+        view.request = view.initialize_request(APIRequestFactory().get('/', params or {}))
+        queryset = view.filter_queryset(view.get_queryset())
+        list(queryset[:settings.REST_FRAMEWORK['PAGE_SIZE']])
+    return run
+
+
+# name: callable running the queries to explain (prefetches included)
+CRITICAL_QUERIES = {
+    'sales_orders.list': view_query(SalesOrderViewSet, 'list'),
+    'sales_orders.list_by_status': view_query(SalesOrderViewSet, 'list', {'status': 'confirmed'}),
+    'sales_orders.list_by_date': view_query(
+        SalesOrderViewSet, 'list', {'status': 'confirmed', 'created_after': '2026-01-01T00:00:00Z'}
+    ),
+    'sales_orders.search': view_query(SalesOrderViewSet, 'list', {'search': 'plan customer 7'}),
+    'sales_orders.retrieve_prefetch': view_query(SalesOrderViewSet, 'retrieve'),
+    'sales_order_lines.list_by_order_status': view_query(SalesOrderLineViewSet, 'list', {'order__status': 'draft'}),
+    'reservations.list': view_query(ReservationViewSet, 'list'),
+    'reservations.list_by_order_status': view_query(ReservationViewSet, 'list', {'order__status': 'confirmed'}),
+    'reservations.search': view_query(ReservationViewSet, 'list', {'search': 'PLAN-SO-1'}),
+    'products.search': view_query(ProductViewSet, 'list', {'search': 'plan product 1'}),
+    'customers.search': view_query(CustomerViewSet, 'list', {'search': 'plan customer 1'}),
+}
+
+
+class StatementRecorder:
+    """
+    execute_wrapper keeping the statements run (and running them).
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            self.statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def capture(run):
+    recorder = StatementRecorder()
+    with connection.execute_wrapper(recorder):
+        run()
+    return recorder.statements
+
+
+def explain_postgresql(sql, params, analyze):
+    options = 'ANALYZE, BUFFERS, FORMAT JSON' if analyze else 'FORMAT JSON'
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN ({options}) {sql}', params)
+        result = cursor.fetchone()[0]
+    plan = (json.loads(result) if isinstance(result, str) else result)[0]['Plan']
+
+    def node(entry):
+        operation = entry['Node Type']
+        if entry.get('Index Name'):
+            operation += f" using {entry['Index Name']}"
+        if entry.get('Relation Name'):
+            operation += f" on {entry['Relation Name']}"
+        return {
+            'operation': operation,
+            'type': entry['Node Type'],
+            'relation': entry.get('Relation Name'),
+            'index': entry.get('Index Name'),
+            'actual_ms': entry.get('Actual Total Time'),
+            'children': [node(child) for child in entry.get('Plans', [])],
+        }
+    return node(plan)
+
+
+SQLITE_SCAN = re.compile(r'^(SCAN|SEARCH) (\S+)(?: AS \S+)?(?: USING (?:COVERING |INTEGER PRIMARY KEY)?(?:INDEX (\S+))?)?')
+
+
+def explain_sqlite(sql, params, analyze):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        rows = cursor.fetchall()
+    nodes = {0: {'operation': 'QUERY PLAN', 'type': 'root', 'relation': None, 'index': None, 'children': []}}
+    for node_id, parent, _, detail in rows:
+        match = SQLITE_SCAN.match(detail)
+        relation = match.group(2) if match else None
+        index = match.group(3) if match else None
+        if match and match.group(1) == 'SCAN' and ' USING ' not in detail:
+            node_type = 'Seq Scan'
+        elif match:
+            node_type = 'Index Scan'
+        else:
+            node_type = detail
+        nodes[node_id] = {
+            'operation': detail, 'type': node_type, 'relation': relation, 'index': index, 'children': []
+        }
+        nodes.get(parent, nodes[0])['children'].append(nodes[node_id])
+    return nodes[0]
+
+
+EXPLAINERS = {
+    'postgresql': explain_postgresql,
+    'sqlite': explain_sqlite,
+}
+
+
+def walk(node, depth=0, nested_loop=False):
+    yield node, depth, nested_loop
+    nested_loop = nested_loop or node['type'] == 'Nested Loop'
+    for child in node['children']:
+        yield from walk(child, depth + 1, nested_loop)
+
+
+def summarize(sql, plan):
+    """
+    The normalized snapshot of a statement: its plan tree without costs,
+    row estimates or timings, and what the checks compare.
+    """
+    lines, seq_scans, indexes, nested = [], set(), set(), set()
+    for node, depth, in_nested_loop in walk(plan):
+        lines.append('  ' * depth + node['operation'])
+        if node['type'] == 'Seq Scan':
+            seq_scans.add(node['relation'])
+        if node['index']:
+            indexes.add(node['index'])
+        if in_nested_loop and node['relation']:
+            nested.add(node['relation'])
+    return {
+        'sql': sql[:SQL_MAX_LENGTH],
+        'plan': lines,
+        'seq_scans': sorted(seq_scans),
+        'indexes': sorted(indexes),
+        'nested_loop_relations': sorted(nested),
+    }
+
+
+def explain_query(name, analyze=False):
+    """
+    Run a registered query and return the summary of each SELECT it
+    issued, plus the plans themselves (with ANALYZE timings on PostgreSQL).
+    """
+    explain = EXPLAINERS.get(connection.vendor)
+    if explain is None:
+        raise ValueError(f"EXPLAIN snapshots are not supported on {connection.vendor}")
+    summaries, plans = [], []
+    for sql, params in capture(CRITICAL_QUERIES[name]):
+        plan = explain(sql, params, analyze)
+        summaries.append(summarize(sql, plan))
+        plans.append(plan)
+    return summaries, plans
+
+
+def table_sizes():
+    """
+    Approximate row count of each table.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT relname, reltuples FROM pg_class WHERE relkind IN ('r', 'p')")
+            return {table: int(rows) for table, rows in cursor.fetchall()}
+        sizes = {}
+        for table in connection.introspection.table_names(cursor):
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            sizes[table] = cursor.fetchone()[0]
+        return sizes
+
+
+def compare(baseline, current, sizes, large_rows):
+    """
+    Regressions of the current statements of a query against its snapshot:
+    extra statements (e.g. a lost prefetch or select_related), new
+    sequential scans, indexes no longer used and new nested loops over
+    tables of `large_rows` rows or more.
+    """
+    problems = []
+    if len(current) > len(baseline):
+        problems.append(f"runs {len(current)} statements instead of {len(baseline)}")
+    for position, (before, after) in enumerate(zip(baseline, current), start=1):
+        prefix = f"statement {position}: " if len(current) > 1 else ''
+        for relation in sorted(set(after['seq_scans']) - set(before['seq_scans'])):
+            problems.append(f"{prefix}new sequential scan on {relation} ({sizes.get(relation, '?')} rows)")
+        for index in sorted(set(before['indexes']) - set(after['indexes'])):
+            problems.append(f"{prefix}no longer uses index {index}")
+        for relation in sorted(set(after['nested_loop_relations']) - set(before['nested_loop_relations'])):
+            if sizes.get(relation, 0) >= large_rows:
+                problems.append(f"{prefix}new nested loop over {relation} ({sizes[relation]} rows)")
+    return problems
+
+
+def snapshot_path():
+    return os.path.join(settings.QUERY_PLAN_SNAPSHOT_DIR, f'{connection.vendor}.json')
+
+
+def load_snapshots():
+    try:
+        with open(snapshot_path()) as source:
+            return json.load(source)
+    except FileNotFoundError:
+        return {}
+
+
+def save_snapshots(snapshots):
+    os.makedirs(settings.QUERY_PLAN_SNAPSHOT_DIR, exist_ok=True)
+    with open(snapshot_path(), 'w') as output:
+        json.dump(snapshots, output, indent=2, sort_keys=True)
+        output.write('\n')
+
+
+def seed(orders, lines=5):
+    """
+    Generate customers, products, orders over the last two years, lines and
+    reservations so the planner sees realistic table sizes.
+    """
+    now = timezone.now()
+    rng = random.Random(0)
+    customers = Customer.objects.bulk_create([
+        Customer(name=f'Plan customer {i}', email=f'plan-customer-{i}@example.com', phone=f'+1555{i:07d}')
+        for i in range(max(orders // 20, 1))
+    ], batch_size=2000)
+    products = Product.objects.bulk_create([
+        Product(
+            name=f'Plan product {i}', internal_reference=f'PLAN-{i}',
+            sales_price=10 + i % 90, cost=5, quantity_on_hand=10 ** 6, forecasted_quantity=10 ** 6
+        )
+        for i in range(max(orders // 50, lines))
+    ], batch_size=2000)
+    statuses = ['draft'] * 2 + ['confirmed'] * 7 + ['cancelled']
+    created = SalesOrder.objects.bulk_create([
+        SalesOrder(customer=rng.choice(customers), number=f'PLAN-SO-{i}', status=rng.choice(statuses))
+        for i in range(orders)
+    ], batch_size=2000)
+    for order in created:
+        order.created_at = now - timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))
+    SalesOrder.objects.bulk_update(created, ['created_at'], batch_size=2000)
+    SalesOrderLine.objects.bulk_create([
+        SalesOrderLine(order=order, product=product, qty=1, unit_price=product.sales_price)
+        for order in created for product in rng.sample(products, lines)
+    ], batch_size=5000)
+    Reservation.objects.bulk_create([
+        Reservation(order=order, product=product, qty=1)
+        for order in created if order.status == 'confirmed' for product in rng.sample(products, lines)
+    ], batch_size=5000)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
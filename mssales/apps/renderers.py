@@ -0,0 +1,65 @@
+"""
+Script Name : renderers.py
+Description : Fast JSON renderer and parser for the API
+Author      : @tonybnya
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency, fall back to DRF's json module
+    orjson = None
+
+# Types orjson does not handle natively (and datetimes, passed through) are
+# encoded by DRF's JSONEncoder, as JSONRenderer would
+_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer using orjson when it is installed, with the output of
+    JSONRenderer: datetimes, decimals and other types encoded by DRF's
+    JSONEncoder, U+2028/U+2029 escaped, integers beyond 64 bits (which
+    orjson refuses) rendered by JSONRenderer. Indented, ASCII-only
+    (UNICODE_JSON off) and non-compact output go through JSONRenderer.
+
+    One difference: NaN and Infinity render as null, where JSONRenderer
+    raises under STRICT_JSON (and writes NaN without it).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        try:
+            ret = orjson.dumps(data, default=_default, option=(
+                orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+            ))
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits; json renders them, or raises the same error
+            return super().render(data, accepted_media_type, renderer_context)
+        # escaped like JSONRenderer, so the output is also valid JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON parser using orjson when it is installed.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
@@ -0,0 +1,14 @@
+"""
+Script Name : apps.py
+Description : Sales app configuration
+Author      : @tonybnya
+"""
+from django.apps import AppConfig
+
+
+class SalesConfig(AppConfig):
+    name = 'apps.sales'
+    label = 'sales'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,104 @@
+"""
+Script Name : archive.py
+Description : Move closed sales orders to the month-partitioned archive tables
+Author      : @tonybnya
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from apps.inventory.models import Reservation
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.utils import timezone
+
+from .models import ArchivedSalesOrder, ArchivedSalesOrderLine, SalesOrder, SalesOrderLine
+
+ARCHIVE_TABLES = ['sales_orders_archive', 'sales_order_lines_archive']
+ORDER_FIELDS = ['id', 'number', 'customer_id', 'status', 'notes', 'created_at', 'updated_at']
+LINE_FIELDS = ['id', 'order_id', 'product_id', 'qty', 'unit_price', 'discount_pct', 'created_at', 'updated_at']
+
+
+def month_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(value, months):
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def ensure_partitions(start, end, using=DEFAULT_DB_ALIAS):
+    """
+    Create the monthly partitions of the archive tables covering [start, end)
+    on PostgreSQL; rows outside them would land in the DEFAULT partitions.
+    Return the names of the partitions created.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return []
+
+    created = []
+    month = month_start(start)
+    with connection.cursor() as cursor:
+        while month < end:
+            next_month = add_months(month, 1)
+            for table in ARCHIVE_TABLES:
+                partition = f'{table}_p{month:%Y%m}'
+                cursor.execute('SELECT to_regclass(%s)', [partition])
+                if cursor.fetchone()[0] is None:
+                    cursor.execute(
+                        f'CREATE TABLE {partition} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)',
+                        [month, next_month]
+                    )
+                    created.append(partition)
+            month = next_month
+    return created
+
+
+def closed_orders(before):
+    """
+    Orders created before `before` that can no longer change: cancelled, or
+    confirmed with no reservation left.
+    """
+    has_reservations = models.Exists(Reservation.objects.filter(order=models.OuterRef('pk')))
+    return SalesOrder.objects.alias(reservations_left=has_reservations).filter(
+        models.Q(status='cancelled') | models.Q(status='confirmed', reservations_left=False),
+        created_at__lt=before
+    )
+
+
+def archive_batch(before, batch_size):
+    """
+    Move one batch of closed orders and their lines to the archive tables,
+    in one transaction. Return (orders, lines) moved.
+    """
+    with transaction.atomic():
+        # rows locked by a concurrent write are left for the next batch
+        ids = list(
+            closed_orders(before)
+            .select_for_update(skip_locked=True, of=('self',))
+            .order_by('created_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0, 0
+
+        archived_at = timezone.now()
+        orders = SalesOrder.objects.filter(pk__in=ids).order_by().with_totals().values(*ORDER_FIELDS, 'subtotal')
+        created_at = {}
+        archived_orders = []
+        for order in orders:
+            created_at[order['id']] = order['created_at']
+            archived_orders.append(ArchivedSalesOrder(**order, archived_at=archived_at))
+        ArchivedSalesOrder.objects.bulk_create(archived_orders)
+
+        lines = SalesOrderLine.objects.filter(order_id__in=ids).values(*LINE_FIELDS)
+        archived_lines = [
+            ArchivedSalesOrderLine(**line, order_created_at=created_at[line['order_id']])
+            for line in lines
+        ]
+        ArchivedSalesOrderLine.objects.bulk_create(archived_lines)
+
+        SalesOrderLine.objects.filter(order_id__in=ids).delete()
+        # stock moves keep their history, their order becomes NULL
+        SalesOrder.objects.filter(pk__in=ids).delete()
+    return len(archived_orders), len(archived_lines)
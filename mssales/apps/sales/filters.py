@@ -0,0 +1,53 @@
+"""
+Script Name : filters.py
+Description : Filters for the Sales app
+Author      : @tonybnya
+"""
+import django_filters
+
+from .models import SalesOrder, SalesOrderLine
+
+
+class SalesOrderFilter(django_filters.FilterSet):
+    """
+    Sales order filters.
+    Date bounds compare the raw columns (created_after <= created_at <
+    created_before) so the created_at/updated_at indexes are used; `status`
+    may be repeated (?status=draft&status=confirmed).
+    """
+    status = django_filters.MultipleChoiceFilter(choices=SalesOrder.STATUS_CHOICES, distinct=False)
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+    updated_after = django_filters.IsoDateTimeFilter(field_name='updated_at', lookup_expr='gte')
+    updated_before = django_filters.IsoDateTimeFilter(field_name='updated_at', lookup_expr='lt')
+    min_total = django_filters.NumberFilter(method='filter_total', label='Minimum untaxed total')
+    max_total = django_filters.NumberFilter(method='filter_total', label='Maximum untaxed total')
+
+    class Meta:
+        model = SalesOrder
+        fields = ['status', 'customer', 'number', 'created_at']
+
+    def filter_total(self, queryset, name, value):
+        if 'subtotal' not in queryset.query.annotations:
+            queryset = queryset.with_totals()
+        lookup = 'subtotal__gte' if name == 'min_total' else 'subtotal__lte'
+        return queryset.filter(**{lookup: value})
+
+
+class SalesOrderLineFilter(django_filters.FilterSet):
+    """
+    Sales order line filters, by order status set, dates and price/quantity ranges.
+    """
+    order__status = django_filters.MultipleChoiceFilter(choices=SalesOrder.STATUS_CHOICES, distinct=False)
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+    updated_after = django_filters.IsoDateTimeFilter(field_name='updated_at', lookup_expr='gte')
+    updated_before = django_filters.IsoDateTimeFilter(field_name='updated_at', lookup_expr='lt')
+    min_unit_price = django_filters.NumberFilter(field_name='unit_price', lookup_expr='gte')
+    max_unit_price = django_filters.NumberFilter(field_name='unit_price', lookup_expr='lte')
+    min_qty = django_filters.NumberFilter(field_name='qty', lookup_expr='gte')
+    max_qty = django_filters.NumberFilter(field_name='qty', lookup_expr='lte')
+
+    class Meta:
+        model = SalesOrderLine
+        fields = ['order', 'product', 'order__status']
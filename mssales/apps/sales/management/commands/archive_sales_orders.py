@@ -0,0 +1,57 @@
+"""
+Script Name : archive_sales_orders.py
+Description : Move closed sales orders older than N months to the archive tables in batches
+Author      : @tonybnya
+"""
+import logging
+import time
+
+from apps.sales.archive import add_months, archive_batch, closed_orders, ensure_partitions
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Archive cancelled orders and confirmed orders without reservations older than --months (schedule it daily)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months', type=int, default=settings.SALES_ARCHIVE_AFTER_MONTHS,
+            help="Archive closed orders created more than this many months ago."
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help="Orders moved per transaction.")
+        parser.add_argument('--max-batches', type=int, default=0, help="Stop after this many batches (0: no limit).")
+
+    def handle(self, *args, **options):
+        before = add_months(timezone.now(), -options['months'])
+        oldest = closed_orders(before).aggregate(oldest=Min('created_at'))['oldest']
+        if oldest is None:
+            self.stdout.write("No closed order to archive.")
+            return
+
+        partitions = ensure_partitions(oldest, before)
+        if partitions:
+            self.stdout.write(f"Created partitions: {', '.join(partitions)}")
+
+        started = time.monotonic()
+        orders = lines = batches = 0
+        while not options['max_batches'] or batches < options['max_batches']:
+            moved_orders, moved_lines = archive_batch(before, options['batch_size'])
+            if not moved_orders:
+                break
+            orders += moved_orders
+            lines += moved_lines
+            batches += 1
+
+        elapsed = time.monotonic() - started
+        rate = orders / elapsed if elapsed else 0
+        message = (
+            f"{orders} order(s) and {lines} line(s) created before {before:%Y-%m-%d} archived "
+            f"in {batches} batch(es), {elapsed:.2f}s ({rate:.0f} orders/s)"
+        )
+        logger.info(message)
+        self.stdout.write(message)
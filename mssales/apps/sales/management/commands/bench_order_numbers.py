@@ -0,0 +1,72 @@
+"""
+Script Name : bench_order_numbers.py
+Description : Concurrent SalesOrder insert benchmark for order number generation
+Author      : @tonybnya
+"""
+import threading
+import time
+import uuid
+
+from apps.customers.models import Customer
+from apps.sales.models import SalesOrder
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, connection, transaction
+
+
+class Command(BaseCommand):
+    help = "Insert sales orders from concurrent threads and report throughput and number collisions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=500, help="Orders inserted by each worker.")
+        parser.add_argument(
+            '--generator',
+            choices=['sequence', 'uuid'],
+            default='sequence',
+            help="'uuid' reproduces the former SO-<8 hex> numbers for comparison."
+        )
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark orders and customer.")
+
+    def handle(self, *args, **options):
+        customer = Customer.objects.create(name='Benchmark', email='benchmark@example.com', phone='0000000000')
+        numbers = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            created, failed = [], []
+            try:
+                for _ in range(options['orders']):
+                    order = SalesOrder(customer=customer)
+                    if options['generator'] == 'uuid':
+                        order.number = f"SO-{uuid.uuid4().hex[:8].upper()}"
+                    try:
+                        with transaction.atomic():
+                            order.save()
+                        created.append(order.number)
+                    except IntegrityError as e:
+                        failed.append(str(e))
+            finally:
+                connection.close()
+            with lock:
+                numbers.extend(created)
+                errors.extend(failed)
+
+        threads = [threading.Thread(target=worker) for _ in range(options['workers'])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        total = len(numbers) + len(errors)
+        self.stdout.write(f"generator:   {options['generator']}")
+        self.stdout.write(f"workers:     {options['workers']}")
+        self.stdout.write(f"inserted:    {len(numbers)} / {total} in {elapsed:.2f}s ({len(numbers) / elapsed:.0f} orders/s)")
+        self.stdout.write(f"collisions:  {len(errors)}")
+        self.stdout.write(f"duplicates:  {len(numbers) - len(set(numbers))}")
+
+        if not options['keep']:
+            SalesOrder.objects.filter(customer=customer).delete()
+            customer.delete()
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:17
+
+from django.db import migrations, models
+
+
+def create_number_source(apps, schema_editor):
+    """
+    PostgreSQL hands out order numbers from a sequence, other databases from
+    a counter row.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE SEQUENCE IF NOT EXISTS sales_order_number_seq')
+    else:
+        NumberSequence = apps.get_model('sales', 'NumberSequence')
+        NumberSequence.objects.get_or_create(name='sales_order', defaults={'next_value': 1})
+
+
+def drop_number_source(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP SEQUENCE IF EXISTS sales_order_number_seq')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NumberSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+            options={
+                'db_table': 'number_sequences',
+            },
+        ),
+        migrations.RunPython(create_number_source, drop_number_source),
+    ]
@@ -0,0 +1,132 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:33
+
+from django.db import migrations, models
+
+# Archive tables: the primary key must include the partition key on
+# PostgreSQL, and each table gets a DEFAULT partition for rows outside the
+# monthly partitions created by apps.sales.archive.
+POSTGRESQL_TABLES = [
+    """
+    CREATE TABLE sales_orders_archive (
+        id bigint NOT NULL,
+        number varchar(50) NOT NULL,
+        customer_id bigint NOT NULL,
+        status varchar(20) NOT NULL,
+        notes text NULL,
+        subtotal numeric(14, 2) NOT NULL,
+        created_at timestamp with time zone NOT NULL,
+        updated_at timestamp with time zone NOT NULL,
+        archived_at timestamp with time zone NOT NULL,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)
+    """,
+    "CREATE TABLE sales_orders_archive_default PARTITION OF sales_orders_archive DEFAULT",
+    "CREATE INDEX sales_orders_archive_customer_idx ON sales_orders_archive (customer_id, created_at)",
+    "CREATE INDEX sales_orders_archive_number_idx ON sales_orders_archive (number)",
+    """
+    CREATE TABLE sales_order_lines_archive (
+        id bigint NOT NULL,
+        order_id bigint NOT NULL,
+        order_created_at timestamp with time zone NOT NULL,
+        product_id bigint NOT NULL,
+        qty integer NOT NULL,
+        unit_price numeric(10, 2) NOT NULL,
+        discount_pct numeric(5, 2) NOT NULL,
+        created_at timestamp with time zone NOT NULL,
+        updated_at timestamp with time zone NOT NULL,
+        PRIMARY KEY (id, order_created_at)
+    ) PARTITION BY RANGE (order_created_at)
+    """,
+    "CREATE TABLE sales_order_lines_archive_default PARTITION OF sales_order_lines_archive DEFAULT",
+    "CREATE INDEX sales_order_lines_archive_order_idx ON sales_order_lines_archive (order_id)",
+]
+
+# Plain tables elsewhere (development databases)
+OTHER_TABLES = [
+    """
+    CREATE TABLE sales_orders_archive (
+        id bigint NOT NULL PRIMARY KEY,
+        number varchar(50) NOT NULL,
+        customer_id bigint NOT NULL,
+        status varchar(20) NOT NULL,
+        notes text NULL,
+        subtotal decimal(14, 2) NOT NULL,
+        created_at datetime NOT NULL,
+        updated_at datetime NOT NULL,
+        archived_at datetime NOT NULL
+    )
+    """,
+    "CREATE INDEX sales_orders_archive_customer_idx ON sales_orders_archive (customer_id, created_at)",
+    "CREATE INDEX sales_orders_archive_number_idx ON sales_orders_archive (number)",
+    """
+    CREATE TABLE sales_order_lines_archive (
+        id bigint NOT NULL PRIMARY KEY,
+        order_id bigint NOT NULL,
+        order_created_at datetime NOT NULL,
+        product_id bigint NOT NULL,
+        qty integer NOT NULL,
+        unit_price decimal(10, 2) NOT NULL,
+        discount_pct decimal(5, 2) NOT NULL,
+        created_at datetime NOT NULL,
+        updated_at datetime NOT NULL
+    )
+    """,
+    "CREATE INDEX sales_order_lines_archive_order_idx ON sales_order_lines_archive (order_id)",
+]
+
+
+def create_archive_tables(apps, schema_editor):
+    statements = POSTGRESQL_TABLES if schema_editor.connection.vendor == 'postgresql' else OTHER_TABLES
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_archive_tables(apps, schema_editor):
+    # dropping a partitioned table drops its partitions
+    schema_editor.execute('DROP TABLE sales_order_lines_archive')
+    schema_editor.execute('DROP TABLE sales_orders_archive')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_numbersequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSalesOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('number', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('draft', 'DRAFT'), ('confirmed', 'CONFIRMED'), ('cancelled', 'CANCELLED')], max_length=20)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'sales_orders_archive',
+                'ordering': ['-created_at'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSalesOrderLine',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('order_created_at', models.DateTimeField()),
+                ('qty', models.IntegerField()),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('discount_pct', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'sales_order_lines_archive',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_archive_tables, drop_archive_tables),
+    ]
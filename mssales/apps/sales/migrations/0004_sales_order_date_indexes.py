@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:39
+
+from django.db import migrations, models
+
+
+def create_line_date_index(apps, schema_editor):
+    """
+    Order lines are append-mostly and inserted in created_at order, so a BRIN
+    index (a few pages for the whole table) serves date ranges on
+    PostgreSQL; other databases get a B-tree.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS sales_order_lines_created_brin '
+            'ON sales_order_lines USING brin (created_at) WITH (pages_per_range = 32)'
+        )
+    else:
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS sales_order_lines_created_idx ON sales_order_lines (created_at)'
+        )
+
+
+def drop_line_date_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS sales_order_lines_created_brin')
+    else:
+        schema_editor.execute('DROP INDEX IF EXISTS sales_order_lines_created_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_archived_sales_orders'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['created_at'], name='sales_orders_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['status', 'created_at'], name='sales_orders_status_crt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['updated_at'], name='sales_orders_updated_at_idx'),
+        ),
+        migrations.RunPython(create_line_date_index, drop_line_date_index),
+    ]
@@ -4,10 +4,26 @@ Description : Sales Order Models
 Author      : @tonybnya
 """
 
-import uuid
+from datetime import timedelta
+from decimal import Decimal
 
+from apps.metrics import CONFIRM_DURATION, ORDER_TRANSITIONS, RESERVATION_CONFLICTS
+from apps.tracing import span, traced
+from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models, transaction
+from django.utils import timezone
+
+from . import pricing
+from .numbering import next_order_number
+
+
+class SalesOrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotate each order with its untaxed `subtotal`, computed in SQL.
+        """
+        return self.annotate(subtotal=pricing.subtotal_expression())
 
 
 class SalesOrder(models.Model):
@@ -29,33 +45,62 @@ class SalesOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SalesOrderQuerySet.as_manager()
+
     class Meta:
         db_table = 'sales_orders'
         ordering = ['-created_at']
+        indexes = [
+            # default ordering and created_after/created_before ranges
+            models.Index(fields=['created_at'], name='sales_orders_created_at_idx'),
+            # status = ? AND created_at >= ? (dashboard, "this week's confirmed orders")
+            models.Index(fields=['status', 'created_at'], name='sales_orders_status_crt_idx'),
+            models.Index(fields=['updated_at'], name='sales_orders_updated_at_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.number:
-            # generate a unique order number
-            self.number = f"SO-{uuid.uuid4().hex[:8].upper()}"
+            # generate a unique order number from a block allocated to this process
+            self.number = next_order_number()
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.number} - {self.customer.name}"
 
+    @property
+    def totals(self):
+        """
+        Untaxed total, VAT and grand total of the order (see pricing).
+        Uses the `subtotal` annotation of with_totals() when present.
+        """
+        if 'subtotal' in self.__dict__:
+            subtotal = self.subtotal
+        else:
+            subtotal = sum((line.line_total for line in self.order_lines.all()), Decimal(0))
+        return pricing.order_totals_from_subtotal(subtotal)
+
     @property
     def total_amount(self):
         """
         Calculate amount of total order.
         """
-        return sum(line.line_total for line in self.order_lines.all())
+        return self.totals['total_amount']
+
+    @property
+    def vat_amount(self):
+        """
+        Calculate VAT of the order (SALES_PRICING['VAT_RATE']).
+        """
+        return self.totals['vat_amount']
 
     @property
     def grand_total(self):
         """
-        Calculate grand total with VAT (20%)
+        Calculate grand total with VAT.
         """
-        return float(self.total_amount) * 1.20
+        return self.totals['grand_total']
 
+    @traced('SalesOrder.confirm_order')
     def confirm_order(self):
         """
         Confirm order and create reservations.
@@ -63,36 +108,79 @@ class SalesOrder(models.Model):
         if self.status != 'draft':
             raise ValueError("Only draft orders can be confirmed")
 
-        with transaction.atomic():
+        ttl = getattr(settings, 'RESERVATION_TTL', 0)
+        expires_at = timezone.now() + timedelta(seconds=ttl) if ttl else None
+
+        with CONFIRM_DURATION.time(), transaction.atomic():
             # create reservations for all order lines
+            reserved = {}
             for line in self.order_lines.all():
-                if line.product.available_quantity < line.qty:
+                with span('SalesOrder.confirm_order.availability', product_id=line.product_id):
+                    available = line.product.available_quantity
+                if available < line.qty:
+                    RESERVATION_CONFLICTS.inc(source='confirm')
                     raise ValueError(f"Insufficient stock for {line.product.name}")
 
                 from apps.inventory.models import Reservation
-                Reservation.objects.create(
-                    order=self,
-                    product=line.product,
-                    qty=line.qty
-                )
+                with span('SalesOrder.confirm_order.reserve', product_id=line.product_id):
+                    Reservation.objects.create(
+                        order=self,
+                        product=line.product,
+                        qty=line.qty,
+                        expires_at=expires_at
+                    )
+                reserved[line.product_id] = line.qty
+
+            from apps.inventory.ledger import record_reservations
+            with span('SalesOrder.confirm_order.ledger'):
+                record_reservations(self.id, reserved)
 
             self.status = 'confirmed'
             self.save()
+            self._record_event('order.confirmed', reserved)
+            transaction.on_commit(lambda: ORDER_TRANSITIONS.inc(transition='confirmed'))
 
+    @traced('SalesOrder.cancel_order')
     def cancel_order(self):
         """
         Cancel order and release reservations
         """
-        if self.status != 'confirmed':
-            raise ValueError("Only confirmed orders can be cancelled")
-
         with transaction.atomic():
-            # Delete all reservations
+            # checked under the order's row lock, so concurrent cancels release once
+            self.status = SalesOrder.objects.select_for_update().values_list('status', flat=True).get(pk=self.pk)
+            if self.status != 'confirmed':
+                raise ValueError("Only confirmed orders can be cancelled")
+
+            # Delete all reservations, releasing only the rows locked here: rows
+            # the expiry sweep deleted meanwhile were already released by it
             from apps.inventory.models import Reservation
-            Reservation.objects.filter(order=self).delete()
+            rows = list(
+                Reservation.objects.filter(order=self).select_for_update().values_list('id', 'product_id', 'qty')
+            )
+            Reservation.objects.filter(pk__in=[row[0] for row in rows]).delete()
+            released = {}
+            for _, product_id, qty in rows:
+                released[product_id] = released.get(product_id, 0) + qty
+
+            from apps.inventory.ledger import record_reservations
+            record_reservations(self.id, released, release=True)
 
             self.status = 'cancelled'
             self.save()
+            self._record_event('order.cancelled', released)
+            transaction.on_commit(lambda: ORDER_TRANSITIONS.inc(transition='cancelled'))
+
+    def _record_event(self, event_type, quantities):
+        """
+        Append an order event to the outbox, in the caller's transaction.
+        """
+        from apps.events.outbox import record_event
+        record_event('sales_order', self.id, event_type, {
+            'number': self.number,
+            'customer_id': self.customer_id,
+            'status': self.status,
+            'products': [{'product_id': product_id, 'qty': qty} for product_id, qty in quantities.items()],
+        })
 
 
 class SalesOrderLine(models.Model):
@@ -114,6 +202,8 @@ class SalesOrderLine(models.Model):
     class Meta:
         db_table = 'sales_order_lines'
         unique_together = ['order', 'product']
+        # the created_at index (BRIN on PostgreSQL, B-tree elsewhere) is created by a RunPython
+        # in migration 0004 and managed only there: do not declare it in `indexes`
 
     def __str__(self):
         return f"{self.order.number} - {self.product.name} (x{self.qty})"
@@ -123,11 +213,94 @@ class SalesOrderLine(models.Model):
         """
         Calculate line total: qty * unit_price * (1 - discount_pct)
         """
-        discount_factor = 1 - (self.discount_pct / 100)
-        return self.qty * self.unit_price * discount_factor
+        return pricing.line_total(self.qty, self.unit_price, self.discount_pct)
 
     def clean(self):
         super().clean()
         # set unit_price to product's sales_price if not provided
         if not self.unit_price and self.product:
             self.unit_price = self.product.sales_price
+
+
+class ArchivedSalesOrder(models.Model):
+    """
+    Modelisation of an ArchivedSalesOrder.
+    Closed order moved out of sales_orders by the archive_sales_orders
+    command. On PostgreSQL the table is range-partitioned by month on
+    created_at (see apps.sales.archive), so its table is not managed by Django.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    number = models.CharField(max_length=50)
+    customer = models.ForeignKey(
+        'customers.Customer', on_delete=models.DO_NOTHING, db_constraint=False, related_name='archived_sales_orders'
+    )
+    status = models.CharField(max_length=20, choices=SalesOrder.STATUS_CHOICES)
+    notes = models.TextField(blank=True, null=True)
+    # untaxed total, computed when the order was archived
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'sales_orders_archive'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.number} (archived)"
+
+    @property
+    def totals(self):
+        return pricing.order_totals_from_subtotal(self.subtotal)
+
+    @property
+    def grand_total(self):
+        return self.totals['grand_total']
+
+
+class ArchivedSalesOrderLine(models.Model):
+    """
+    Modelisation of an ArchivedSalesOrderLine.
+    Partitioned like its order, on the order's created_at.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        ArchivedSalesOrder, on_delete=models.DO_NOTHING, db_constraint=False, related_name='order_lines'
+    )
+    order_created_at = models.DateTimeField()
+    product = models.ForeignKey('products.Product', on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+
+    qty = models.IntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    discount_pct = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'sales_order_lines_archive'
+
+    def __str__(self):
+        return f"{self.order_id} - {self.product_id} (x{self.qty})"
+
+    @property
+    def line_total(self):
+        return pricing.line_total(self.qty, self.unit_price, self.discount_pct)
+
+
+class NumberSequence(models.Model):
+    """
+    Modelisation of a NumberSequence.
+    Block-allocating counter backing order numbers on databases without sequences.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+
+    class Meta:
+        db_table = 'number_sequences'
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
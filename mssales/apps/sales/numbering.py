@@ -0,0 +1,123 @@
+"""
+Script Name : numbering.py
+Description : Gap-tolerant, block-allocated sales order numbers
+Author      : @tonybnya
+"""
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SEQUENCE_NAME = 'sales_order_number_seq'
+COUNTER_TABLE = 'number_sequences'
+COUNTER_NAME = 'sales_order'
+
+DEFAULTS = {
+    'PREFIX': 'SO-',
+    'FORMAT': '{prefix}{value:010d}',
+    'BLOCK_SIZE': 50,
+}
+
+
+def get_numbering_settings():
+    return {**DEFAULTS, **getattr(settings, 'SALES_ORDER_NUMBER', {})}
+
+
+class NumberBlockAllocator:
+    """
+    Hand out unique integers from blocks reserved in the database.
+
+    Each process reserves BLOCK_SIZE values at a time, so creating orders
+    only touches the sequence (PostgreSQL) or the counter row (other
+    databases) once per block. Values of a block lost on restart are simply
+    skipped: numbers are unique and increasing per process, not gapless.
+    """
+
+    def __init__(self, alias=DEFAULT_DB_ALIAS):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._values = deque()
+        self._connection = None
+        self._pid = os.getpid()
+
+    def next_value(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # forked worker: never reuse the parent's block
+                self._values.clear()
+                self._connection = None
+                self._pid = os.getpid()
+            if not self._values:
+                connection = connections[self.alias]
+                if connection.vendor == 'sqlite' and connection.in_atomic_block:
+                    # SQLite has a single writer: a dedicated connection would wait for the
+                    # caller's write lock. Take one value in the caller's transaction and
+                    # cache nothing, as a rollback hands the value back.
+                    return self._bump_counter(connection, 1)[0]
+                self._values.extend(self._allocate_block(get_numbering_settings()['BLOCK_SIZE']))
+            return self._values.popleft()
+
+    def _allocate_block(self, size):
+        if connections[self.alias].vendor == 'postgresql':
+            # nextval() is not transactional, so the caller's transaction is irrelevant
+            with connections[self.alias].cursor() as cursor:
+                cursor.execute('SELECT nextval(%s) FROM generate_series(1, %s)', [SEQUENCE_NAME, size])
+                return [row[0] for row in cursor.fetchall()]
+        return self._allocate_counter_block(size)
+
+    def _allocate_counter_block(self, size):
+        """
+        Bump the counter row on a dedicated connection and commit at once, so
+        the row lock is never held for the duration of the caller's
+        transaction and a caller rollback cannot hand the block out twice.
+        """
+        if self._connection is None:
+            self._connection = connections.create_connection(self.alias)
+            # shared by every thread of the process, always under self._lock
+            self._connection.inc_thread_sharing()
+
+        connection = self._connection
+        connection.ensure_connection()
+        connection.set_autocommit(False)
+        try:
+            block = self._bump_counter(connection, size)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.set_autocommit(True)
+        return block
+
+    @staticmethod
+    def _bump_counter(connection, size):
+        """
+        Reserve `size` values of the counter row in the connection's current
+        transaction.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {COUNTER_TABLE} SET next_value = next_value + %s WHERE name = %s',
+                [size, COUNTER_NAME]
+            )
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    f'INSERT INTO {COUNTER_TABLE} (name, next_value) VALUES (%s, %s)',
+                    [COUNTER_NAME, 1 + size]
+                )
+            cursor.execute(f'SELECT next_value FROM {COUNTER_TABLE} WHERE name = %s', [COUNTER_NAME])
+            end = cursor.fetchone()[0]
+        return range(end - size, end)
+
+
+_allocator = NumberBlockAllocator()
+
+
+def next_order_number():
+    """
+    Return the next sales order number, formatted with SALES_ORDER_NUMBER.
+    """
+    options = get_numbering_settings()
+    return options['FORMAT'].format(prefix=options['PREFIX'], value=_allocator.next_value())
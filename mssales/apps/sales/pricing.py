@@ -0,0 +1,133 @@
+"""
+Script Name : pricing.py
+Description : Decimal-exact line totals, VAT and grand totals for sales orders
+Author      : @tonybnya
+"""
+import decimal
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import models
+from django.db.models.functions import Coalesce, Round
+
+DEFAULTS = {
+    'VAT_RATE': Decimal('0.20'),
+    'DECIMAL_PLACES': 2,
+    'ROUNDING': decimal.ROUND_HALF_UP,
+    'ROUND_LINES': True,
+}
+
+# Line totals are always rounded half up, like SQL ROUND() on the
+# non-negative amounts of order lines, so that totals computed in the
+# database and in Python agree to the cent.
+LINE_ROUNDING = decimal.ROUND_HALF_UP
+
+
+def get_pricing_settings():
+    options = {**DEFAULTS, **getattr(settings, 'SALES_PRICING', {})}
+    options['VAT_RATE'] = Decimal(str(options['VAT_RATE']))
+    options['QUANTUM'] = Decimal(1).scaleb(-options['DECIMAL_PLACES'])
+    return options
+
+
+def line_total(qty, unit_price, discount_pct=0):
+    """
+    qty * unit_price * (1 - discount_pct / 100), rounded when ROUND_LINES is set.
+    """
+    options = get_pricing_settings()
+    amount = qty * Decimal(unit_price) * (100 - Decimal(discount_pct)) / 100
+    if options['ROUND_LINES']:
+        return amount.quantize(options['QUANTUM'], rounding=LINE_ROUNDING)
+    return amount
+
+
+def order_totals_from_subtotal(subtotal):
+    """
+    Return {'total_amount', 'vat_amount', 'grand_total'} for an untaxed subtotal.
+    """
+    options = get_pricing_settings()
+    total_amount = Decimal(subtotal).quantize(options['QUANTUM'], rounding=options['ROUNDING'])
+    vat_amount = (total_amount * options['VAT_RATE']).quantize(options['QUANTUM'], rounding=options['ROUNDING'])
+    return {
+        'total_amount': total_amount,
+        'vat_amount': vat_amount,
+        'grand_total': total_amount + vat_amount,
+    }
+
+
+def line_total_expression(prefix=''):
+    """
+    SQL equivalent of `line_total` over the SalesOrderLine fields reached
+    through `prefix` (e.g. 'order_lines__' from SalesOrder).
+    """
+    options = get_pricing_settings()
+    output_field = models.DecimalField(max_digits=20, decimal_places=options['DECIMAL_PLACES'] + 4)
+    amount = models.ExpressionWrapper(
+        models.F(f'{prefix}qty') * models.F(f'{prefix}unit_price')
+        * (models.Value(100) - models.F(f'{prefix}discount_pct')) / models.Value(100),
+        output_field=output_field
+    )
+    if options['ROUND_LINES']:
+        amount = Round(amount, options['DECIMAL_PLACES'], output_field=output_field)
+    return amount
+
+
+def subtotal_expression(prefix='order_lines__', **extra):
+    """
+    Sum of the line totals of an order queryset, 0 when it has no lines.
+    """
+    options = get_pricing_settings()
+    output_field = models.DecimalField(max_digits=20, decimal_places=options['DECIMAL_PLACES'] + 4)
+    return Coalesce(
+        models.Sum(line_total_expression(prefix), **extra),
+        models.Value(Decimal(0)),
+        output_field=output_field
+    )
+
+
+def order_subtotals(order_ids):
+    """
+    Return {order_id: untaxed subtotal} for `order_ids` with one grouped query.
+    """
+    from .models import SalesOrderLine
+
+    rows = SalesOrderLine.objects.filter(order_id__in=order_ids).order_by().values('order_id').annotate(
+        subtotal=models.Sum(line_total_expression())
+    ).values_list('order_id', 'subtotal')
+    subtotals = dict.fromkeys(order_ids, Decimal(0))
+    subtotals.update(rows)
+    return subtotals
+
+
+def order_totals(order_ids):
+    """
+    Return {order_id: {'total_amount', 'vat_amount', 'grand_total'}} for a batch of orders.
+    """
+    return {
+        order_id: order_totals_from_subtotal(subtotal)
+        for order_id, subtotal in order_subtotals(order_ids).items()
+    }
+
+
+def order_stats(orders):
+    """
+    Return order counts and untaxed amounts, overall and per status, for an
+    order queryset with one aggregate query:
+    {'total_orders', 'total_amount', 'draft_orders', 'draft_amount', ...}
+    """
+    from .models import SalesOrder
+
+    aggregates = {
+        'total_orders': models.Count('id', distinct=True),
+        'total_amount': subtotal_expression(),
+    }
+    for status, _ in SalesOrder.STATUS_CHOICES:
+        aggregates[f'{status}_orders'] = models.Count('id', filter=models.Q(status=status), distinct=True)
+        aggregates[f'{status}_amount'] = subtotal_expression(filter=models.Q(status=status))
+
+    stats = orders.order_by().aggregate(**aggregates)
+    options = get_pricing_settings()
+    for key, value in stats.items():
+        if key.endswith('_amount'):
+            stats[key] = Decimal(value).quantize(options['QUANTUM'], rounding=options['ROUNDING'])
+    return stats
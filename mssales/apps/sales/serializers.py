@@ -5,12 +5,18 @@ Author      : @tonybnya
 """
 
 
+from apps.inventory.models import Reservation
+from apps.metrics import RESERVATION_CONFLICTS
+from apps.products.models import Product
+from apps.tracing import TracedSerializerMixin
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import SalesOrder, SalesOrderLine
+from .models import ArchivedSalesOrder, ArchivedSalesOrderLine, SalesOrder, SalesOrderLine
 from decimal import Decimal
 
 
-class SalesOrderLineSerializer(serializers.ModelSerializer):
+class SalesOrderLineSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer of the SalesOrderLine Model.
     """
@@ -56,25 +62,29 @@ class SalesOrderLineSerializer(serializers.ModelSerializer):
 
             available = product.available_quantity + current_reserved
             if qty > available:
+                RESERVATION_CONFLICTS.inc(source='line_validation')
                 raise serializers.ValidationError(f"Insufficient stock. Available: {available}, Requested: {qty}")
         return data
 
 
-class SalesOrderSerializer(serializers.ModelSerializer):
+class SalesOrderSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     customer_name = serializers.CharField(source='customer.name', read_only=True)
     customer_email = serializers.CharField(source='customer.email', read_only=True)
     order_lines = SalesOrderLineSerializer(many=True, read_only=True)
     total_amount = serializers.ReadOnlyField()
+    vat_amount = serializers.ReadOnlyField()
     grand_total = serializers.ReadOnlyField()
 
     class Meta:
         model = SalesOrder
         fields = [
             'id', 'number', 'customer', 'customer_name', 'customer_email',
-            'status', 'notes', 'order_lines', 'total_amount', 'grand_total',
+            'status', 'notes', 'order_lines', 'total_amount', 'vat_amount', 'grand_total',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'number', 'total_amount', 'grand_total', 'created_at', 'updated_at']
+        read_only_fields = [
+            'id', 'number', 'total_amount', 'vat_amount', 'grand_total', 'created_at', 'updated_at'
+        ]
 
     def validate_status(self, value):
         if self.instance:
@@ -113,7 +123,7 @@ class SalesOrderCreateSerializer(serializers.ModelSerializer):
         return order
 
 
-class SalesOrderSummarySerializer(serializers.ModelSerializer):
+class SalesOrderSummarySerializer(TracedSerializerMixin, serializers.ModelSerializer):
     """
     Lightweight serializer for lists.
     """
@@ -123,3 +133,137 @@ class SalesOrderSummarySerializer(serializers.ModelSerializer):
     class Meta:
         model = SalesOrder
         fields = ['id', 'number', 'customer_name', 'status', 'total_amount']
+
+
+class BulkLineCreateSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    qty = serializers.IntegerField(min_value=1)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False, allow_null=True)
+    discount_pct = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, max_value=100, required=False)
+
+
+class BulkLineUpdateSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1)
+    qty = serializers.IntegerField(min_value=1, required=False)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    discount_pct = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, max_value=100, required=False)
+
+
+class SalesOrderLineBulkSerializer(serializers.Serializer):
+    """
+    Creates, updates and deletes many lines of one draft order at once.
+    Products and stock are loaded with one query each and every change is
+    validated against that single snapshot.
+    """
+    create = BulkLineCreateSerializer(many=True, required=False)
+    update = BulkLineUpdateSerializer(many=True, required=False)
+    delete = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+
+    def validate(self, data):
+        order = self.context['order']
+        creates = data.get('create', [])
+        updates = data.get('update', [])
+        deletes = set(data.get('delete', []))
+
+        lines = {line.id: line for line in order.order_lines.all()}
+        unknown = sorted(({item['id'] for item in updates} | deletes) - lines.keys())
+        if unknown:
+            raise serializers.ValidationError(f"Lines not found in order {order.number}: {unknown}")
+        if len({item['id'] for item in updates}) != len(updates):
+            raise serializers.ValidationError("A line can only be updated once per request.")
+        if deletes & {item['id'] for item in updates}:
+            raise serializers.ValidationError("A line cannot be both updated and deleted.")
+
+        # one product per line, as enforced by unique_together
+        kept_products = [line.product_id for line_id, line in lines.items() if line_id not in deletes]
+        created_products = [item['product'] for item in creates]
+        duplicates = sorted({pk for pk in created_products if created_products.count(pk) > 1 or pk in kept_products})
+        if duplicates:
+            raise serializers.ValidationError(f"Order already has a line for products: {duplicates}")
+
+        product_ids = set(created_products) | {lines[item['id']].product_id for item in updates if 'qty' in item}
+        products = Product.objects.in_bulk(product_ids)
+        missing = sorted(product_ids - products.keys())
+        if missing:
+            raise serializers.ValidationError(f"Products not found: {missing}")
+
+        reserved = Reservation.objects.active().reserved_by_product(product_ids)
+        requested = [(item['product'], item['qty']) for item in creates]
+        requested += [(lines[item['id']].product_id, item['qty']) for item in updates if 'qty' in item]
+        errors = []
+        for product_id, qty in requested:
+            available = products[product_id].quantity_on_hand - reserved.get(product_id, 0)
+            if qty > available:
+                errors.append(
+                    f"Insufficient stock for {products[product_id].name}. Available: {available}, Requested: {qty}"
+                )
+        if errors:
+            RESERVATION_CONFLICTS.inc(source='bulk_line_validation')
+            raise serializers.ValidationError(errors)
+
+        data['lines'] = lines
+        data['products'] = products
+        return data
+
+    def save(self):
+        order = self.context['order']
+        data = self.validated_data
+        lines, products = data['lines'], data['products']
+        now = timezone.now()
+
+        new_lines = []
+        for item in data.get('create', []):
+            unit_price = item.get('unit_price')
+            new_lines.append(SalesOrderLine(
+                order=order,
+                product_id=item['product'],
+                qty=item['qty'],
+                unit_price=unit_price if unit_price is not None else products[item['product']].sales_price,
+                discount_pct=item.get('discount_pct', Decimal('0'))
+            ))
+
+        changed_lines = []
+        for item in data.get('update', []):
+            line = lines[item['id']]
+            for field in ('qty', 'unit_price', 'discount_pct'):
+                if field in item:
+                    setattr(line, field, item[field])
+            line.updated_at = now
+            changed_lines.append(line)
+
+        with transaction.atomic():
+            SalesOrderLine.objects.filter(order=order, pk__in=data.get('delete', [])).delete()
+            SalesOrderLine.objects.bulk_update(changed_lines, ['qty', 'unit_price', 'discount_pct', 'updated_at'])
+            SalesOrderLine.objects.bulk_create(new_lines)
+            SalesOrder.objects.filter(pk=order.pk).update(updated_at=now)
+
+        return {
+            'created': len(new_lines),
+            'updated': len(changed_lines),
+            'deleted': len(data.get('delete', []))
+        }
+
+
+class ArchivedSalesOrderLineSerializer(serializers.ModelSerializer):
+    line_total = serializers.ReadOnlyField()
+
+    class Meta:
+        model = ArchivedSalesOrderLine
+        fields = ['id', 'product', 'qty', 'unit_price', 'discount_pct', 'line_total']
+
+
+class ArchivedSalesOrderSerializer(serializers.ModelSerializer):
+    """
+    Read-only serializer for archived orders.
+    """
+    customer_name = serializers.CharField(source='customer.name', read_only=True, default=None)
+    order_lines = ArchivedSalesOrderLineSerializer(many=True, read_only=True)
+    total_amount = serializers.DecimalField(source='subtotal', max_digits=14, decimal_places=2, read_only=True)
+    grand_total = serializers.ReadOnlyField()
+
+    class Meta:
+        model = ArchivedSalesOrder
+        fields = [
+            'id', 'number', 'customer', 'customer_name', 'status', 'notes', 'order_lines',
+            'total_amount', 'grand_total', 'created_at', 'updated_at', 'archived_at'
+        ]
@@ -0,0 +1,19 @@
+"""
+Script Name : signals.py
+Description : Signal handlers of the Sales app
+Author      : @tonybnya
+"""
+from apps.customers.models import Customer
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+
+@receiver(pre_delete, sender=Customer)
+def delete_archived_orders(sender, instance, **kwargs):
+    """
+    Delete the archived orders of a deleted customer, which the cascade
+    does not reach (the archive has no foreign key constraint).
+    """
+    from apps.purge import delete_archived_orders as delete_archive
+
+    delete_archive([instance.pk])
@@ -0,0 +1,24 @@
+"""
+Script Name : tests.py
+Description : Tests of the sales app
+Author      : @tonybnya
+"""
+from apps.customers.models import Customer
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from .models import SalesOrder
+from .numbering import _allocator
+
+
+class OrderNumberingTests(TransactionTestCase):
+    def setUp(self):
+        _allocator._values.clear()
+
+    def test_create_order_after_write_in_transaction(self):
+        # the caller already holds the SQLite write lock when the number is allocated
+        with transaction.atomic():
+            customer = Customer.objects.create(name='Numbering', email='numbering@example.com', phone='+15550000001')
+            order = SalesOrder.objects.create(customer=customer)
+        self.assertTrue(order.number)
+
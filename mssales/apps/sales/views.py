@@ -4,29 +4,38 @@ Description : Views of the Sales Model
 Author      : @tonybnya
 """
 
+from apps.mixins import IdempotencyMixin, MultiGetMixin, ReplicaReadMixin, TracingMixin
+from django.core.exceptions import ValidationError
 from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .models import SalesOrder, SalesOrderLine
-from .serializers import (SalesOrderCreateSerializer, SalesOrderLineSerializer,
+from .filters import SalesOrderFilter, SalesOrderLineFilter
+from .models import ArchivedSalesOrder, SalesOrder, SalesOrderLine
+from .pricing import order_stats
+from .serializers import (ArchivedSalesOrderSerializer, SalesOrderCreateSerializer,
+                          SalesOrderLineBulkSerializer, SalesOrderLineSerializer,
                           SalesOrderSerializer, SalesOrderSummarySerializer)
 
 
-class SalesOrderViewSet(viewsets.ModelViewSet):
+class SalesOrderViewSet(TracingMixin, MultiGetMixin, IdempotencyMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     Sales Order View.
     """
     queryset = SalesOrder.objects.all().select_related('customer').prefetch_related('order_lines__product')
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['status', 'customer', 'created_at']
+    filterset_class = SalesOrderFilter
     search_fields = ['number', 'customer__name', 'customer__email', 'notes']
     ordering_fields = ['created_at', 'number', 'total_amount']
     ordering = ['-created_at']
+    replica_actions = {'list': None, 'dashboard': 30, 'archived': 30}
+    throttle_costs = {'dashboard': 10, 'archived': 5}
+    idempotent_actions = {'create', 'confirm', 'cancel'}
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -35,6 +44,13 @@ class SalesOrderViewSet(viewsets.ModelViewSet):
             return SalesOrderSummarySerializer
         return SalesOrderSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # list totals are computed in SQL, the lines are not needed
+            queryset = queryset.prefetch_related(None).with_totals()
+        return queryset
+
     @action(detail=True, methods=['post'])
     def confirm(self, request, pk=None):
         """Confirm a draft order"""
@@ -86,19 +102,40 @@ class SalesOrderViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def dashboard(self, request):
         """Get dashboard statistics"""
-        orders = self.get_queryset()
-        
+        stats = order_stats(self.get_queryset())
         stats = {
-            'total_orders': orders.count(),
-            'draft_orders': orders.filter(status='draft').count(),
-            'confirmed_orders': orders.filter(status='confirmed').count(),
-            'cancelled_orders': orders.filter(status='cancelled').count(),
-            'total_revenue': sum(order.total_amount for order in orders.filter(status='confirmed')),
-            'pending_revenue': sum(order.total_amount for order in orders.filter(status='draft')),
+            'total_orders': stats['total_orders'],
+            'draft_orders': stats['draft_orders'],
+            'confirmed_orders': stats['confirmed_orders'],
+            'cancelled_orders': stats['cancelled_orders'],
+            'total_revenue': stats['confirmed_amount'],
+            'pending_revenue': stats['draft_amount'],
         }
-        
+
         return Response(stats)
 
+    @action(detail=False, methods=['get'])
+    def archived(self, request):
+        """
+        Get archived orders (closed orders moved out of the live table).
+        Filters: customer, status, number, created_after, created_before
+        (a created_at range only scans the matching monthly partitions).
+        """
+        queryset = ArchivedSalesOrder.objects.select_related('customer').prefetch_related('order_lines')
+        params = request.query_params
+        try:
+            for param, lookup in [
+                ('customer', 'customer_id'), ('status', 'status'), ('number', 'number'),
+                ('created_after', 'created_at__gte'), ('created_before', 'created_at__lt'),
+            ]:
+                if params.get(param):
+                    queryset = queryset.filter(**{lookup: params[param]})
+            page = self.paginate_queryset(queryset)
+        except (ValueError, ValidationError) as e:
+            return Response({'error': ' '.join(getattr(e, 'messages', [str(e)]))}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ArchivedSalesOrderSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['get'])
     def lines(self, request, pk=None):
         """Get order lines for a specific order"""
@@ -107,8 +144,30 @@ class SalesOrderViewSet(viewsets.ModelViewSet):
         serializer = SalesOrderLineSerializer(lines, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'], url_path='lines/bulk')
+    def bulk_lines(self, request, pk=None):
+        """
+        Create, update and delete many lines of a draft order in one request:
+        {"create": [{product, qty, ...}], "update": [{id, qty, ...}], "delete": [id, ...]}
+        """
+        order = self.get_object()
+        if order.status not in ['draft']:
+            raise PermissionDenied("Cannot modify lines of non-draft orders")
+
+        serializer = SalesOrderLineBulkSerializer(data=request.data, context={'order': order})
+        serializer.is_valid(raise_exception=True)
+        counts = serializer.save()
+
+        # reload once so totals are computed over the final lines
+        order = self.get_queryset().get(pk=order.pk)
+        return Response({
+            'message': 'Order lines updated successfully',
+            **counts,
+            'order': SalesOrderSerializer(order).data
+        })
+
 
-class SalesOrderLineViewSet(viewsets.ModelViewSet):
+class SalesOrderLineViewSet(TracingMixin, viewsets.ModelViewSet):
     """
     Sales Order Line View
     """
@@ -116,7 +175,7 @@ class SalesOrderLineViewSet(viewsets.ModelViewSet):
     serializer_class = SalesOrderLineSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['order', 'product', 'order__status']
+    filterset_class = SalesOrderLineFilter
     search_fields = ['product__name', 'order__number']
     ordering = ['id']
 
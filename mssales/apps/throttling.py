@@ -0,0 +1,133 @@
+"""
+Script Name : throttling.py
+Description : Cost-weighted throttles backed by an in-process sliding-window counter
+Author      : @tonybnya
+"""
+import threading
+import time
+
+from rest_framework.throttling import SimpleRateThrottle
+
+# How often (seconds) idle counters are dropped
+PURGE_INTERVAL = 60
+
+
+class SlidingWindowCounter:
+    """
+    Sliding-window rate counter kept in process memory.
+
+    Each key holds the hits of the current fixed window and of the previous
+    one; the previous window is weighted by how much of it still overlaps the
+    sliding window. A check is a dict lookup and a few float operations under
+    a lock, with no I/O. Limits apply per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> (window_start, duration, previous_hits, current_hits)
+        self._windows = {}
+        self._next_purge = time.monotonic() + PURGE_INTERVAL
+
+    def hit(self, key, cost, limit, duration, now=None):
+        """
+        Count `cost` hits against `key` if the sliding-window total stays
+        within `limit`. Return (allowed, wait), `wait` being the seconds
+        until the same hit would be allowed.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            start, _, previous, current = self._windows.get(key, (now, duration, 0, 0))
+            elapsed = now - start
+            if elapsed >= duration:
+                windows = int(elapsed // duration)
+                previous = current if windows == 1 else 0
+                current = 0
+                start += windows * duration
+                elapsed = now - start
+
+            estimate = previous * (1 - elapsed / duration) + current
+            allowed = estimate + cost <= limit
+            if allowed:
+                current += cost
+            self._windows[key] = (start, duration, previous, current)
+
+            if now >= self._next_purge:
+                self._purge(now)
+
+        if allowed:
+            return True, 0
+        return False, self._wait(previous, current, cost, limit, duration, elapsed)
+
+    @staticmethod
+    def _wait(previous, current, cost, limit, duration, elapsed):
+        remaining = duration - elapsed
+        # the previous window fades out at `previous / duration` hits per second
+        excess = previous * remaining / duration + current + cost - limit
+        if current + cost <= limit:
+            return excess / previous * duration
+        # past the current window, the current hits become the fading ones
+        return remaining + (1 - (limit - cost) / current) * duration
+
+    def _purge(self, now):
+        self._windows = {
+            key: window for key, window in self._windows.items()
+            if now - window[0] < 2 * window[1]
+        }
+        self._next_purge = now + PURGE_INTERVAL
+
+
+counter = SlidingWindowCounter()
+
+
+class CostRateThrottle(SimpleRateThrottle):
+    """
+    Rate throttle where each request counts `throttle_costs[action]` hits
+    (default 1) of the view, so expensive reports use up the rate faster.
+    """
+    counter = counter
+
+    def get_cost(self, request, view):
+        cost = getattr(view, 'throttle_costs', {}).get(getattr(view, 'action', None), 1)
+        # a request costing more than the whole rate could never pass
+        return min(cost, self.num_requests)
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'anon:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        allowed, self._wait = self.counter.hit(key, self.get_cost(request, view), self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class UserRateThrottle(CostRateThrottle):
+    """
+    Limit the overall request rate of each user (or client IP when anonymous).
+    """
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        return (self.scope, self.get_ident_key(request))
+
+
+class EndpointRateThrottle(CostRateThrottle):
+    """
+    Limit the rate of each user on each endpoint (view and action), so
+    hammering one report does not use up the whole user rate.
+    """
+    scope = 'endpoint'
+
+    def get_cache_key(self, request, view):
+        endpoint = getattr(view, 'basename', None) or type(view).__name__
+        return (self.scope, self.get_ident_key(request), endpoint, getattr(view, 'action', None))
@@ -0,0 +1,239 @@
+"""
+Script Name : tracing.py
+Description : Sampled request tracing with console, file or OpenTelemetry export
+Author      : @tonybnya
+"""
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # optional dependency, otel exporter unavailable
+    otel_trace = None
+
+# longest SQL statement kept on a span
+SQL_MAX_LENGTH = 500
+
+# innermost open span of the current request, None when it is not traced
+_current = ContextVar('tracing_span', default=None)
+
+
+class Span:
+    """
+    A timed operation of a trace; `spans` is shared by the whole trace and
+    receives each span when it ends.
+    """
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'start', 'end', 'error', 'spans')
+
+    def __init__(self, name, attributes, parent=None):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.spans = parent.spans if parent else []
+        self.error = None
+        self.end = None
+        self.start = time.time_ns()
+
+    def finish(self):
+        self.end = time.time_ns()
+        self.spans.append(self)
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration_ms': round((self.end - self.start) / 1e6, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class ConsoleExporter:
+    """
+    Print each trace as an indented tree on stderr.
+    """
+
+    def export(self, spans):
+        children = {}
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+        lines = []
+
+        def walk(parent_id, depth):
+            for span in sorted(children.get(parent_id, []), key=lambda span: span.start):
+                error = f" !{span.error}" if span.error else ''
+                lines.append(f"{'  ' * depth}{span.name} {(span.end - span.start) / 1e6:.2f}ms{error}")
+                walk(span.span_id, depth + 1)
+
+        walk(None, 0)
+        sys.stderr.write(f"trace {spans[0].trace_id}\n" + '\n'.join(lines) + '\n')
+
+
+class FileExporter:
+    """
+    Append each trace as one JSON line to TRACING_FILE_PATH.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def export(self, spans):
+        line = json.dumps({'trace_id': spans[0].trace_id, 'spans': [span.as_dict() for span in spans]}, default=str)
+        with self.lock, open(settings.TRACING_FILE_PATH, 'a') as output:
+            output.write(line + '\n')
+
+
+class OpenTelemetryExporter:
+    """
+    Replay finished traces into the OpenTelemetry tracer provider configured
+    by the deployment (its exporters and processors apply).
+    """
+
+    def __init__(self):
+        self.tracer = otel_trace.get_tracer('mssales')
+
+    def export(self, spans):
+        started = {}
+        for span in sorted(spans, key=lambda span: span.start):
+            parent = started.get(span.parent_id)
+            context = otel_trace.set_span_in_context(parent) if parent is not None else None
+            otel_span = self.tracer.start_span(
+                span.name, context=context, attributes=span.attributes, start_time=span.start
+            )
+            if span.error:
+                otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, span.error))
+            started[span.span_id] = otel_span
+        for span in spans:
+            started[span.span_id].end(end_time=span.end)
+
+
+EXPORTERS = {
+    'console': ConsoleExporter,
+    'file': FileExporter,
+}
+if otel_trace is not None:
+    EXPORTERS['otel'] = OpenTelemetryExporter
+
+_exporter = None
+
+
+def get_exporter():
+    """
+    Exporter named by TRACING_EXPORTER, or None when tracing is off.
+    """
+    global _exporter
+    name = getattr(settings, 'TRACING_EXPORTER', 'none')
+    if name not in EXPORTERS:
+        return None
+    if _exporter is None or not isinstance(_exporter, EXPORTERS[name]):
+        _exporter = EXPORTERS[name]()
+    return _exporter
+
+
+@contextmanager
+def start_trace(name, **attributes):
+    """
+    Open the root span of a request, for TRACING_SAMPLE_RATE of the calls;
+    yield None (and record nothing below it) otherwise.
+    """
+    exporter = get_exporter()
+    if exporter is None or _current.get() is not None or random.random() >= settings.TRACING_SAMPLE_RATE:
+        yield None
+        return
+
+    root = Span(name, attributes)
+    token = _current.set(root)
+    try:
+        yield root
+    except Exception as e:
+        root.error = repr(e)
+        raise
+    finally:
+        _current.reset(token)
+        root.finish()
+        exporter.export(root.spans)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block as a child of the current span; a no-op outside a sampled
+    trace.
+    """
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attributes, parent)
+    token = _current.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.error = repr(e)
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+def traced(name):
+    """
+    Decorator running the function in a span.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SQLSpans:
+    """
+    execute_wrapper recording each query as a span.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        with span('sql', database=self.alias, statement=sql[:SQL_MAX_LENGTH], many=many):
+            return execute(sql, params, many, context)
+
+
+class TracedSerializerMixin:
+    """
+    Trace to_representation of the serializer and of its many=True lists.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_serializer = super().many_init(*args, **kwargs)
+        list_serializer.to_representation = traced(f'{cls.__name__}.to_representation[]')(
+            list_serializer.to_representation
+        )
+        return list_serializer
+
+    def to_representation(self, instance):
+        # items of a traced list are covered by the list span
+        if self.parent is not None or _current.get() is None:
+            return super().to_representation(instance)
+        with span(f'{type(self).__name__}.to_representation'):
+            return super().to_representation(instance)
@@ -11,9 +11,12 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from datetime import timedelta
+from decimal import Decimal
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,6 +55,7 @@ INSTALLED_APPS = [
     'apps',
     'apps.authentication',
     'apps.customers',
+    'apps.events',
     'apps.inventory',
     'apps.products',
     'apps.sales',
@@ -59,12 +63,16 @@ INSTALLED_APPS = [
     # third-party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'django_filters',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.middleware.TracingMiddleware',
+    'apps.middleware.MetricsMiddleware',
+    'apps.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -102,7 +110,7 @@ DATABASES = {
         # 'ENGINE': 'django.db.backends.sqlite3',
         # 'NAME': BASE_DIR / 'db.sqlite3',
         # PostgreSQL
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': config("DATABASE_ENGINE", default="django.db.backends.postgresql"),
         'NAME': config("DATABASE_NAME"),
         'USER': config("DATABASE_USER"),
         'PASSWORD': config("DATABASE_PASSWORD"),
@@ -111,6 +119,27 @@ DATABASES = {
     }
 }
 
+# Read replica (optional)
+# Safe report/list actions are routed to this alias by apps.db_routers.ReplicaRouter.
+# For local testing, point DATABASE_REPLICA_NAME at a copy of the primary database.
+DATABASE_REPLICA_ALIAS = 'replica'
+
+if config("DATABASE_REPLICA_NAME", default=""):
+    DATABASES[DATABASE_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': config("DATABASE_REPLICA_NAME"),
+        'HOST': config("DATABASE_REPLICA_HOST", default=DATABASES['default']['HOST']),
+        'PORT': config("DATABASE_REPLICA_PORT", default=DATABASES['default']['PORT'], cast=int),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['apps.db_routers.ReplicaRouter']
+
+# Maximum replication lag (seconds) tolerated by replica reads, unless an action sets its own
+REPLICA_LAG_TOLERANCE = config("REPLICA_LAG_TOLERANCE", default=5, cast=float)
+# How often (seconds) each process re-measures the replica lag
+REPLICA_LAG_CHECK_INTERVAL = config("REPLICA_LAG_CHECK_INTERVAL", default=1, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -157,11 +186,20 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.authentication.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
@@ -169,6 +207,15 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # Per-process sliding windows (apps.throttling); views weight expensive actions with throttle_costs.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'apps.throttling.UserRateThrottle',
+        'apps.throttling.EndpointRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'user': config("THROTTLE_USER_RATE", default="1200/min"),
+        'endpoint': config("THROTTLE_ENDPOINT_RATE", default="300/min"),
+    },
 }
 
 # Simple JWT
@@ -179,6 +226,38 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Seconds a User row loaded through ClaimsUser.full_user stays cached per process, and the
+# most users kept (least recently used first out)
+JWT_USER_CACHE_TTL = config("JWT_USER_CACHE_TTL", default=30, cast=int)
+JWT_USER_CACHE_SIZE = config("JWT_USER_CACHE_SIZE", default=10000, cast=int)
+
+# Refresh token blacklist (apps.authentication.blacklist)
+# Revoked JTIs are kept in a per-process Bloom filter and in the shared cache.
+JWT_BLACKLIST_BLOOM_CAPACITY = config("JWT_BLACKLIST_BLOOM_CAPACITY", default=100000, cast=int)
+JWT_BLACKLIST_BLOOM_ERROR_RATE = 0.001
+# Seconds between pulls of newly blacklisted tokens into each process' filter
+JWT_BLACKLIST_SYNC_INTERVAL = config("JWT_BLACKLIST_SYNC_INTERVAL", default=2, cast=float)
+# Seconds between full rebuilds of the filter (drops expired tokens)
+JWT_BLACKLIST_REBUILD_INTERVAL = config("JWT_BLACKLIST_REBUILD_INTERVAL", default=3600, cast=float)
+# Seconds a database answer for a Bloom filter hit stays in the shared cache
+JWT_BLACKLIST_CACHE_TIMEOUT = 300
+
+# Cache
+# Shared between processes in production (e.g. django.core.cache.backends.redis.RedisCache).
+CACHES = {
+    'default': {
+        'BACKEND': config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        'LOCATION': config("CACHE_LOCATION", default="mssales"),
+    }
+}
+
+# Idempotency-Key support (apps.mixins.IdempotencyMixin), kept in the cache above
+# Seconds a completed response is replayed for, and how long a duplicate waits for the first request.
+IDEMPOTENCY_TTL = config("IDEMPOTENCY_TTL", default=86400, cast=int)
+IDEMPOTENCY_WAIT_TIMEOUT = config("IDEMPOTENCY_WAIT_TIMEOUT", default=10, cast=float)
+# Seconds before the lock of a request whose worker died is released
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
 # CORS
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -188,3 +267,103 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+# retried POSTs from the web client carry an Idempotency-Key
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
+
+# Reservations
+# Lifetime (seconds) of the reservations created by confirming an order; 0 means they never expire.
+# Expired reservations are released by the sweep_reservations command.
+RESERVATION_TTL = config("RESERVATION_TTL", default=0, cast=int)
+
+# Sales order archival
+# archive_sales_orders moves cancelled orders, and confirmed ones without reservations,
+# older than this many months to the archive tables (partitioned by month on PostgreSQL).
+SALES_ARCHIVE_AFTER_MONTHS = config("SALES_ARCHIVE_AFTER_MONTHS", default=12, cast=int)
+
+# Outbox (apps.events)
+# Order and stock events are written with the change and delivered by relay_outbox
+# to a JSON lines file or a webhook. Delivered events are pruned after RETENTION_DAYS.
+# The file sink writes to the temporary directory unless OUTBOX_FILE_PATH is set.
+OUTBOX_SINK = config("OUTBOX_SINK", default="file")
+OUTBOX_FILE_PATH = config("OUTBOX_FILE_PATH", default=os.path.join(tempfile.gettempdir(), 'mssales-outbox.jsonl'))
+OUTBOX_WEBHOOK_URL = config("OUTBOX_WEBHOOK_URL", default="http://localhost:8001/events")
+OUTBOX_WEBHOOK_TIMEOUT = config("OUTBOX_WEBHOOK_TIMEOUT", default=5, cast=float)
+OUTBOX_BATCH_SIZE = config("OUTBOX_BATCH_SIZE", default=500, cast=int)
+OUTBOX_RETENTION_DAYS = config("OUTBOX_RETENTION_DAYS", default=7, cast=int)
+
+# Server-sent events (apps.events.stream)
+# One poller per process reads the outbox every POLL_INTERVAL seconds and fans the
+# availability/dashboard deltas out to its subscribers (serve with an ASGI server).
+SSE_POLL_INTERVAL = config("SSE_POLL_INTERVAL", default=1.0, cast=float)
+SSE_BATCH_SIZE = 500
+# seconds an outbox id skipped by the poller is awaited (its transaction may still commit)
+SSE_GAP_GRACE = config("SSE_GAP_GRACE", default=30, cast=float)
+# messages buffered per subscriber before it is dropped with a `resync` message
+SSE_QUEUE_SIZE = 1000
+SSE_KEEPALIVE = 15
+# seconds before a stream is closed (clients reconnect), reclaims streams of vanished clients
+SSE_MAX_DURATION = config("SSE_MAX_DURATION", default=300, cast=int)
+
+# Sales order numbers
+# Each process reserves BLOCK_SIZE numbers at a time from a database sequence (PostgreSQL)
+# or a counter table, so numbers are unique but may have gaps.
+SALES_ORDER_NUMBER = {
+    'PREFIX': config("SALES_ORDER_NUMBER_PREFIX", default="SO-"),
+    'FORMAT': '{prefix}{value:010d}',
+    'BLOCK_SIZE': config("SALES_ORDER_NUMBER_BLOCK_SIZE", default=50, cast=int),
+}
+
+# Customers
+# Country calling code given to phone numbers stored without an international prefix
+CUSTOMER_DEFAULT_COUNTRY_CODE = config("CUSTOMER_DEFAULT_COUNTRY_CODE", default="1")
+
+# Scanner lookups (apps.products.cache)
+# Per-process LRU of barcode/internal reference -> product; entries also expire after the TTL (seconds)
+# so that changes made by other processes are picked up.
+PRODUCT_LOOKUP_CACHE_SIZE = config("PRODUCT_LOOKUP_CACHE_SIZE", default=10000, cast=int)
+PRODUCT_LOOKUP_CACHE_TTL = config("PRODUCT_LOOKUP_CACHE_TTL", default=60, cast=int)
+
+# Sales pricing
+# Line totals are rounded half up to DECIMAL_PLACES when ROUND_LINES is set; ROUNDING
+# (a decimal module rounding mode) applies to order totals and VAT.
+SALES_PRICING = {
+    'VAT_RATE': config("SALES_VAT_RATE", default="0.20", cast=Decimal),
+    'DECIMAL_PLACES': 2,
+    'ROUNDING': config("SALES_ROUNDING", default="ROUND_HALF_UP"),
+    'ROUND_LINES': True,
+}
+
+# Metrics (apps.metrics), exposed at /metrics in the Prometheus text format
+# Under multi-process servers set METRICS_DIR to a directory shared by the workers of one
+# host (emptied on deploy): each process writes its totals there every METRICS_FLUSH_INTERVAL
+# seconds, totals of exited workers are kept in retired.json, and /metrics sums them.
+# METRICS_TOKEN, when set, is required as a Bearer token.
+METRICS_DIR = config("METRICS_DIR", default="")
+METRICS_FLUSH_INTERVAL = config("METRICS_FLUSH_INTERVAL", default=5, cast=float)
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
+# Response compression
+# Responses are compressed with brotli (if installed) or gzip, as negotiated with Accept-Encoding.
+# Bodies smaller than COMPRESSION_MIN_SIZE bytes are sent uncompressed.
+COMPRESSION_MIN_SIZE = config("COMPRESSION_MIN_SIZE", default=1024, cast=int)
+COMPRESSION_GZIP_LEVEL = config("COMPRESSION_GZIP_LEVEL", default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config("COMPRESSION_BROTLI_QUALITY", default=5, cast=int)
+
+# Tracing: spans for view dispatch, filter backends, order transitions, SQL queries and
+# serialization, for TRACING_SAMPLE_RATE of the requests. TRACING_EXPORTER is "none"
+# (default), "console" (stderr), "file" (JSON lines in TRACING_FILE_PATH) or "otel"
+# (the OpenTelemetry tracer provider of the deployment, needs opentelemetry-api).
+# The file exporter writes to the temporary directory unless TRACING_FILE_PATH is set.
+TRACING_EXPORTER = config("TRACING_EXPORTER", default="none")
+TRACING_SAMPLE_RATE = config("TRACING_SAMPLE_RATE", default=0.01, cast=float)
+TRACING_FILE_PATH = config("TRACING_FILE_PATH", default=os.path.join(tempfile.gettempdir(), 'mssales-traces.jsonl'))
+
+# Query plans: normalized EXPLAIN snapshots of the critical querysets (apps/query_plans.py),
+# one file per database vendor, checked by `manage.py check_query_plans`.
+QUERY_PLAN_SNAPSHOT_DIR = os.path.join(BASE_DIR, 'query_plans')
+
+# Multi-get: `?ids=1,2,3` on the product, customer, sales order and reservation lists
+# returns those objects as retrieve would; MULTI_GET_MAX_IDS bounds one request.
+MULTI_GET_MAX_IDS = config("MULTI_GET_MAX_IDS", default=100, cast=int)
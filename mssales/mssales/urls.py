@@ -14,14 +14,17 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from apps.metrics import metrics_view
 from django.contrib import admin
 from django.urls import include, path
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/v1/', include('apps.products.urls')),
     path('api/v1/', include('apps.customers.urls')),
     path('api/v1/', include('apps.sales.urls')),
     path('api/v1/', include('apps.inventory.urls')),
+    path('api/v1/', include('apps.events.urls')),
     path('api/auth/', include('apps.authentication.urls')),
 ]